@@ -4,12 +4,12 @@ Detects upcoming/recent earnings and assigns risk level.
 """
 from datetime import datetime, timedelta
 from typing import Optional
-from services.finnhub_client import FinnhubClient
+from services.finnhub_client import get_client
 from schemas.agent_schemas import EarningsAgentOutput
 
 class EarningsEventAgent:
     def __init__(self):
-        self.client = FinnhubClient()
+        self.client = get_client()
     
     def _calculate_risk_level(self, earnings_date_str: Optional[str]) -> tuple:
         """
@@ -4,7 +4,7 @@ Fetches company news, tags by reason type, and returns top 3 most relevant headl
 """
 from typing import List, Dict
 from datetime import datetime
-from services.finnhub_client import FinnhubClient
+from services.finnhub_client import get_client
 from schemas.agent_schemas import NewsAgentOutput, NewsHeadline
 
 class NewsIngestionAgent:
@@ -18,7 +18,7 @@ class NewsIngestionAgent:
     }
     
     def __init__(self):
-        self.client = FinnhubClient()
+        self.client = get_client()
     
     def _tag_headline(self, headline: str) -> str:
         """Tag headline based on keyword matching."""
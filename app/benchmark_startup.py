@@ -0,0 +1,105 @@
+"""
+Measure Streamlit app startup and rerun cost.
+1. Cold import time, in fresh interpreters, of the modules the app
+   imported eagerly before views were made lazy against the ones it
+   imports now (plus each module on its own).
+2. With streamlit installed, first-run and rerun wall time of the app
+   script through streamlit's AppTest, for the current file and for the
+   version at --baseline (a git revision), per view.
+
+Usage: python app/benchmark_startup.py [--repeats 5] [--baseline HEAD~1]
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Imports executed at startup before and after deferring them
+EAGER_IMPORTS = [
+    "model.predict", "model.batch_predict", "rag.rag_chain", "app.chatbot", "app.market_summary",
+    "agents.orchestrator", "utils.volatility_analyzer", "data.store", "data.feature_registry",
+]
+LAZY_IMPORTS = [
+    "model.predict", "model.batch_predict", "app.market_summary", "data.store", "data.feature_registry",
+]
+VIEWS = ["📊 Dashboard", "📈 Volatility Analysis", "📋 Prediction", "🤖 Chatbot"]
+
+
+def cold_import_seconds(modules, repeats):
+    """Median time to import `modules` in a fresh interpreter, or the import error."""
+    code = (
+        "import sys, time; sys.path.insert(0, '.'); start = time.perf_counter()\n"
+        + "".join(f"import {m}\n" for m in modules)
+        + "print(time.perf_counter() - start)"
+    )
+    times = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            return result.stderr.strip().splitlines()[-1]
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def app_run_seconds(script, view, repeats):
+    """(first run, median rerun) wall time of the app script showing one view."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(script), default_timeout=120)
+    app.session_state["view"] = view
+    start = time.perf_counter()
+    app.run()
+    first = time.perf_counter() - start
+    reruns = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        app.run()
+        reruns.append(time.perf_counter() - start)
+    return first, statistics.median(reruns)
+
+
+def fmt(value):
+    return f"{value * 1e3:9.1f} ms" if isinstance(value, float) else f"unavailable ({value})"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark app cold start and rerun time")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--baseline", default=None,
+                        help="Git revision of app/streamlit_app.py to compare against (e.g. HEAD~1)")
+    args = parser.parse_args()
+
+    print("Cold import (median of fresh interpreters):")
+    print(f"  before (eager): {fmt(cold_import_seconds(EAGER_IMPORTS, args.repeats))}")
+    print(f"  after (lazy):   {fmt(cold_import_seconds(LAZY_IMPORTS, args.repeats))}")
+    for module in EAGER_IMPORTS:
+        deferred = "" if module in LAZY_IMPORTS else "  (deferred)"
+        print(f"    {module:<28}{fmt(cold_import_seconds([module], args.repeats))}{deferred}")
+
+    if importlib.util.find_spec("streamlit") is None:
+        print("\nstreamlit is not installed; skipping app run timings")
+    else:
+        scripts = {"current": ROOT / "app" / "streamlit_app.py"}
+        if args.baseline:
+            baseline = ROOT / "app" / "_baseline_streamlit_app.py"
+            source = subprocess.run(["git", "show", f"{args.baseline}:app/streamlit_app.py"],
+                                    cwd=ROOT, capture_output=True, text=True, check=True).stdout
+            baseline.write_text(source)
+            scripts = {"baseline": baseline, **scripts}
+
+        os.chdir(ROOT)
+        try:
+            print("\nApp run (first run / median rerun):")
+            for label, script in scripts.items():
+                for view in VIEWS:
+                    first, rerun = app_run_seconds(script, view, args.repeats)
+                    print(f"  {label:<9}{view:<26}{fmt(first)} / {fmt(rerun)}")
+        finally:
+            if args.baseline:
+                baseline.unlink()
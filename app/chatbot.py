@@ -4,23 +4,31 @@ Enhanced chatbot tools using Finnhub API and yfinance
 import yfinance as yf
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
-from datetime import datetime
-from services.finnhub_client import FinnhubClient
+import pandas as pd
+from datetime import datetime, timedelta
+from data.price_provider import get_provider
+from services.finnhub_client import get_client
 
-# Initialize Finnhub client
-finnhub = FinnhubClient()
+# Shared Finnhub client (pooled keep-alive session)
+finnhub = get_client()
 
 def get_stock_price(ticker: str) -> str:
-    """Get current stock price using yfinance"""
+    """Get current stock price (local store first, remote tail only)"""
     try:
         print(f"DEBUG: Ticker={ticker}")
-        stock = yf.Ticker(ticker)
-        data = stock.history(period="1d")
+        # Latest session's bar
+        frames, failures = get_provider().history_many([ticker], start=(datetime.now() - timedelta(days=7)).date())
+        if ticker not in frames:
+            return f"Could not fetch price for {ticker}: {failures.get(ticker, 'unknown error')}"
+        data = frames[ticker].tail(1)
         if not data.empty:
             price = data['Close'].iloc[-1]
             change = data['Close'].iloc[-1] - data['Open'].iloc[0]
             change_pct = (change / data['Open'].iloc[0]) * 100
-            return f"💰 {ticker} Price: ${price:.2f}\n📊 Change: ${change:.2f} ({change_pct:+.2f}%)"
+            result = f"💰 {ticker} Price: ${price:.2f}\n📊 Change: ${change:.2f} ({change_pct:+.2f}%)"
+            if ticker in failures:
+                result += f"\n⚠️ Stored close from {data['Date'].iloc[-1]:%Y-%m-%d}; live update failed"
+            return result
         return f"Could not fetch price for {ticker}"
     except Exception as e:
         return f"Error: {str(e)}"
@@ -38,10 +46,9 @@ def get_stock_info(ticker: str) -> str:
         return f"Error: {str(e)}"
 
 def get_stock_history(ticker: str) -> str:
-    """Get 30-day stock price history using yfinance"""
+    """Get 30-day stock price history (local store first, remote tail only)"""
     try:
-        stock = yf.Ticker(ticker)
-        data = stock.history(period="1mo")
+        data = get_provider().history(ticker, start=(pd.Timestamp.now() - pd.DateOffset(months=1)).date())
         if not data.empty:
             high = data['High'].max()
             low = data['Low'].min()
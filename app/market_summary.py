@@ -1,31 +1,124 @@
 """
 Market summary utilities for sidebar display
+The watchlist is fetched with batched multi-ticker downloads and served
+stale-while-revalidate: once a snapshot exists it is returned
+immediately, and a snapshot older than the refresh interval triggers a
+background refresh instead of blocking the page.
 """
-import yfinance as yf
-import streamlit as st
+import os
+import threading
+import time
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_market_summary():
-    """Get summary of top stock tickers"""
-    tickers = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'NVDA']
+import pandas as pd
+
+DEFAULT_WATCHLIST = [
+    'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'NVDA',
+    'META', 'GE', 'JPM', 'V', 'XOM', 'SPY',
+]
+REFRESH_SECONDS = 300  # 5 minutes
+
+
+def watchlist():
+    """Tickers from MARKET_SUMMARY_TICKERS (comma separated), else the default list."""
+    configured = os.getenv("MARKET_SUMMARY_TICKERS")
+    if configured:
+        return [t.strip().upper() for t in configured.split(",") if t.strip()]
+    return list(DEFAULT_WATCHLIST)
+
+
+def fetch_market_summary(tickers):
+    """
+    Latest session's price and change for every ticker. Stored bars come
+    from the local store and only missing tails are downloaded, in
+    batched requests.
+    Returns (summary, failures): a list of per-ticker dicts in watchlist
+    order and {ticker: reason} for tickers that returned nothing or only
+    stored bars (those are in the summary with 'stale' set).
+    """
+    from data.price_provider import get_provider
+
+    start = (pd.Timestamp.now() - pd.Timedelta(days=7)).normalize()
+    frames, failures = get_provider().history_many(tickers, start=start)
     summary = []
-    
     for ticker in tickers:
-        try:
-            stock = yf.Ticker(ticker)
-            data = stock.history(period="1d")
-            if not data.empty:
-                price = data['Close'].iloc[-1]
-                change = data['Close'].iloc[-1] - data['Open'].iloc[0]
-                change_pct = (change / data['Open'].iloc[0]) * 100
-                
-                summary.append({
-                    'ticker': ticker,
-                    'price': price,
-                    'change': change,
-                    'change_pct': change_pct
-                })
-        except:
+        data = frames.get(ticker)
+        if data is None or data.empty:
+            failures.setdefault(ticker, "no recent bars")
             continue
-    
-    return summary
+        data = data.tail(1)
+        stale = ticker in failures
+        price = data['Close'].iloc[-1]
+        change = data['Close'].iloc[-1] - data['Open'].iloc[0]
+        change_pct = (change / data['Open'].iloc[0]) * 100
+        summary.append({
+            'ticker': ticker,
+            'price': price,
+            'change': change,
+            'change_pct': change_pct,
+            'date': data['Date'].iloc[-1],
+            'stale': stale,
+        })
+    return summary, failures
+
+
+class MarketSummaryCache:
+    """Latest watchlist snapshot per ticker list, refreshed in the background once stale."""
+
+    def __init__(self, refresh_seconds=REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._snapshots = {}  # tuple(tickers) -> snapshot dict
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _refresh(self, key):
+        try:
+            summary, failures = fetch_market_summary(list(key))
+            snapshot = {"stocks": summary, "failures": failures, "fetched_at": time.time(), "error": None}
+        except Exception as e:
+            previous = self._snapshots.get(key)
+            snapshot = dict(previous) if previous else {"stocks": [], "failures": {}, "fetched_at": time.time()}
+            snapshot["error"] = str(e)
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._refreshing.discard(key)
+
+    def get(self, tickers):
+        key = tuple(tickers)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            stale = snapshot is None or time.time() - snapshot["fetched_at"] > self.refresh_seconds
+            start_refresh = stale and key not in self._refreshing
+            if start_refresh:
+                self._refreshing.add(key)
+
+        if snapshot is None:
+            # Nothing to serve yet: the first fetch blocks
+            if start_refresh:
+                self._refresh(key)
+            else:
+                while key in self._refreshing:
+                    time.sleep(0.05)
+        elif start_refresh:
+            threading.Thread(target=self._refresh, args=(key,), daemon=True).start()
+
+        with self._lock:
+            snapshot = dict(self._snapshots[key])
+            snapshot["refreshing"] = key in self._refreshing
+        snapshot["age_seconds"] = time.time() - snapshot["fetched_at"]
+        return snapshot
+
+
+_cache = MarketSummaryCache()
+
+
+def get_market_snapshot(tickers=None):
+    """
+    Current watchlist snapshot: stocks, failures ({ticker: reason}),
+    error (whole refresh failed), age_seconds and refreshing.
+    """
+    return _cache.get(tickers or watchlist())
+
+
+def get_market_summary(tickers=None):
+    """Get summary of watchlist tickers"""
+    return get_market_snapshot(tickers)["stocks"]
@@ -1,6 +1,8 @@
 """
 Stock Trend Predictor with AI Intelligence System
-Four-tab UI: Dashboard | Volatility Analysis | Prediction | Chatbot
+Four views: Dashboard | Volatility Analysis | Prediction | Chatbot
+Only the selected view runs on each rerun; the agents, chatbot tools and
+volatility analyzer are imported the first time their view needs them.
 """
 import streamlit as st
 import pandas as pd
@@ -11,11 +13,10 @@ import os
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from model.predict import predict_trend
-from rag.rag_chain import get_rag_chain
-from app.chatbot import get_stock_price, get_stock_info, get_stock_history, AGENT_TOOLS, process_query
-from app.market_summary import get_market_summary
-from agents.orchestrator import AgentOrchestrator
-from utils.volatility_analyzer import analyze_stock_volatility
+from model.batch_predict import INDICATOR_COLS, PREDICTIONS_PATH, load_predictions
+from app.market_summary import get_market_snapshot
+from data.store import existing_path, read_frame, universe
+from data.feature_registry import select_features
 
 # Page config
 st.set_page_config(page_title="Stock Trend Predictor", layout="wide")
@@ -23,6 +24,7 @@ st.set_page_config(page_title="Stock Trend Predictor", layout="wide")
 # Cache the orchestrator
 @st.cache_resource
 def get_orchestrator():
+    from agents.orchestrator import AgentOrchestrator
     return AgentOrchestrator()
 
 # Cache Finnhub results for 15 minutes
@@ -31,6 +33,64 @@ def run_intelligence_cached(ticker, prediction, indicators, confidence):
     orchestrator = get_orchestrator()
     return orchestrator.run_intelligence(ticker, prediction, indicators, confidence)
 
+# Feature data shared by every tab and session, reloaded when the file changes
+@st.cache_resource
+def feature_loader_stats():
+    return {"calls": 0, "loads": 0}
+
+@st.cache_data(max_entries=32)
+def _load_features_cached(ticker, mtime_ns, size):
+    feature_loader_stats()["loads"] += 1
+    return read_frame(ticker).set_index("Date")
+
+def load_features(ticker):
+    """Typed, date-indexed feature frame for a ticker, cached on its file's mtime and size."""
+    path = existing_path(ticker, "features")
+    if path is None:
+        raise FileNotFoundError(f"No features data stored for {ticker}")
+    stat = os.stat(path)
+    feature_loader_stats()["calls"] += 1
+    return _load_features_cached(ticker, stat.st_mtime_ns, stat.st_size)
+
+# Nightly prediction table, reloaded when model/batch_predict.py rewrites it
+@st.cache_data
+def load_prediction_table(mtime):
+    return load_predictions()
+
+def latest_prediction(ticker):
+    """
+    Precomputed prediction for a ticker, or a live one when the table has
+    no entry yet (new ticker, batch job not run) or its entry is older
+    than the latest feature row (batch job not rerun since).
+    """
+    df = load_features(ticker)
+    latest = df.tail(1)
+    mtime = os.path.getmtime(PREDICTIONS_PATH) if os.path.exists(PREDICTIONS_PATH) else None
+    record = load_prediction_table(mtime).get(ticker)
+    if record is not None and pd.Timestamp(record["Date"]) >= latest.index[0]:
+        return record
+
+    trend, confidence = predict_trend(latest[select_features(df.columns)], ticker)
+    record = {col: latest[col].values[0] if col in latest.columns else float("nan") for col in INDICATOR_COLS}
+    record.update({"Ticker": ticker, "Date": latest.index[0], "Trend": trend, "Confidence": confidence})
+    return record
+
+# Volatility chart and report per ticker and last bar (date and close, so a re-downloaded
+# partial bar invalidates the entry): repeat views skip the RV computation and matplotlib rendering
+@st.cache_data(max_entries=64)
+def _volatility_analysis_cached(ticker, as_of, last_close, _analyzer):
+    _analyzer.calculate_realized_volatility()
+    return (_analyzer.rv_data, _analyzer.render_volatility_png(), _analyzer.render_regime_png(),
+            _analyzer.generate_analysis_report())
+
+def volatility_analysis(ticker):
+    """(rv frame, chart PNG bytes, regime chart PNG bytes, report) for a ticker as of its latest bar."""
+    from utils.volatility_analyzer import RealizedVolatilityAnalyzer
+
+    analyzer = RealizedVolatilityAnalyzer(ticker)
+    data = analyzer.fetch_data()
+    return _volatility_analysis_cached(analyzer.ticker, data.index[-1], float(data['Close'].iloc[-1]), analyzer)
+
 st.title("📈 TrendPulse AI")
 
 # Global ticker selection in sidebar
@@ -38,30 +98,15 @@ with st.sidebar:
     st.header("🎯 Stock Selection")
     selected_ticker = st.selectbox(
         "Select Stock",
-        ["AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "GE"],
+        universe("features"),
         key="global_ticker"
     )
     
     # Display prediction for selected ticker
     try:
-        pred_df = pd.read_csv(f"data/{selected_ticker}_features.csv")
-        pred_latest = pred_df.tail(1)
-        
-        # Determine features
-        pred_base_features = ["MA20", "MA50", "Return", "Volume"]
-        pred_optional_features = []
-        if "RSI" in pred_df.columns:
-            pred_optional_features.append("RSI")
-        if "MACD" in pred_df.columns:
-            pred_optional_features.append("MACD")
-        if "MACD_Hist" in pred_df.columns:
-            pred_optional_features.append("MACD_Hist")
-        
-        pred_all_features = pred_base_features + pred_optional_features
-        pred_latest_features = pred_latest[pred_all_features]
-        
         # Get prediction
-        pred_trend, pred_confidence = predict_trend(pred_latest_features)
+        pred_record = latest_prediction(selected_ticker)
+        pred_trend, pred_confidence = pred_record["Trend"], pred_record["Confidence"]
         
         st.divider()
         st.subheader("🔮 Prediction")
@@ -72,24 +117,21 @@ with st.sidebar:
             st.error(f"📉 **DOWN**")
         
         st.metric("Confidence", f"{pred_confidence}%")
+        st.caption(f"As of {pd.Timestamp(pred_record['Date']).date()}")
         
     except Exception as e:
         st.caption("⚠️ Prediction unavailable")
     
     st.divider()
 
-# Create Tabs
-tab1, tab2, tab3, tab4 = st.tabs([
-    "📊 Dashboard",
-    "📈 Volatility Analysis",
-    "📋 Prediction",
-    "🤖 Chatbot"
-])
+# View selector (unlike st.tabs, only the selected view is executed)
+VIEWS = ["📊 Dashboard", "📈 Volatility Analysis", "📋 Prediction", "🤖 Chatbot"]
+view = st.radio("View", VIEWS, horizontal=True, label_visibility="collapsed", key="view")
 
 # ============================================================================
 # DASHBOARD PAGE
 # ============================================================================
-with tab1:
+if view == VIEWS[0]:
     st.header("📊 Stock Market Dashboard")
     
     # Use global ticker selection
@@ -97,21 +139,7 @@ with tab1:
     
     # Load data
     try:
-        dash_df = pd.read_csv(f"data/{dash_ticker}_features.csv")
-        
-        # Check if Date column exists, otherwise use index
-        if 'Date' in dash_df.columns:
-            dash_df['Date'] = pd.to_datetime(dash_df['Date'])
-            dash_df.set_index('Date', inplace=True)
-        elif dash_df.index.name != 'Date':
-            # If no Date column, try to parse the first column or index
-            if pd.api.types.is_numeric_dtype(dash_df.index):
-                # Reset index and try to find date column
-                dash_df = dash_df.reset_index()
-                if 'index' in dash_df.columns:
-                    dash_df['Date'] = pd.to_datetime(dash_df['index'])
-                    dash_df.set_index('Date', inplace=True)
-                    dash_df.drop('index', axis=1, inplace=True, errors='ignore')
+        dash_df = load_features(dash_ticker)
         
         # Display key metrics
         st.subheader(f"{dash_ticker} Key Metrics")
@@ -161,12 +189,12 @@ with tab1:
         st.area_chart(returns_data)
         
     except FileNotFoundError:
-        st.error(f"❌ {dash_ticker}_features.csv not found. Please run fetch_data.py and feature_engineering.py first.")
+        st.error(f"❌ {dash_ticker} features not found. Please run fetch_data.py and feature_engineering.py first.")
 
 # ============================================================================
 # VOLATILITY ANALYSIS PAGE
 # ============================================================================
-with tab2:
+if view == VIEWS[1]:
     st.header("📊 Realized Volatility Analysis")
     st.write("Quantitative equity analysis: 30/60/90 day rolling realized volatility trends")
 
@@ -178,8 +206,9 @@ with tab2:
     if st.button("🔍 Analyze Volatility", type="primary"):
         with st.spinner(f"Analyzing {ticker_input} volatility patterns..."):
             try:
-                fig, report = analyze_stock_volatility(ticker_input)
-                st.pyplot(fig)
+                _, chart_png, regime_png, report = volatility_analysis(ticker_input)
+                st.image(chart_png, width="stretch")
+                st.image(regime_png, width="stretch")
                 st.markdown(report)
             except Exception as e:
                 st.error(f"❌ Error analyzing {ticker_input}: {str(e)}")
@@ -188,36 +217,19 @@ with tab2:
 # ============================================================================
 # PREDICTION PAGE
 # ============================================================================
-with tab3:
+if view == VIEWS[2]:
     st.subheader("Prediction Result")
 
     # Use global ticker selection
     ticker = selected_ticker
 
-    # Load features data for selected ticker
+    # Latest prediction and indicators for selected ticker
     try:
-        df = pd.read_csv(f"data/{ticker}_features.csv")
+        latest = latest_prediction(ticker)
     except FileNotFoundError:
-        st.error(f"❌ {ticker}_features.csv not found. Please run fetch_data.py and feature_engineering.py first.")
+        st.error(f"❌ {ticker} features not found. Please run fetch_data.py and feature_engineering.py first.")
         st.stop()
 
-    # Get latest row
-    latest = df.tail(1)
-
-    # Determine which features to use
-    base_features = ["MA20", "MA50", "Return", "Volume"]
-    optional_features = []
-
-    if "RSI" in df.columns:
-        optional_features.append("RSI")
-    if "MACD" in df.columns:
-        optional_features.append("MACD")
-    if "MACD_Hist" in df.columns:
-        optional_features.append("MACD_Hist")
-
-    all_features = base_features + optional_features
-    latest_features = latest[all_features]
-
     # Create two columns
     col_pred, col_news = st.columns([1, 1])
 
@@ -227,22 +239,23 @@ with tab3:
         
         st.markdown(f"**Ticker:** {ticker}")
         
-        # Generate prediction
-        trend, confidence = predict_trend(latest_features)
+        # Precomputed prediction
+        trend, confidence = latest["Trend"], latest["Confidence"]
         
         # Display prediction
         st.markdown(f"### Prediction: {trend}")
         st.markdown(f"**Confidence:** {confidence}%")
+        st.caption(f"As of {pd.Timestamp(latest['Date']).date()}")
         
         st.divider()
         
         # Display indicators
         st.subheader("Latest Indicators")
         
-        ma20 = latest["MA20"].values[0]
-        ma50 = latest["MA50"].values[0]
-        ret = latest["Return"].values[0]
-        vol = latest["Volume"].values[0]
+        ma20 = latest["MA20"]
+        ma50 = latest["MA50"]
+        ret = latest["Return"]
+        vol = latest["Volume"]
         
         col1, col2 = st.columns(2)
         
@@ -255,8 +268,8 @@ with tab3:
             st.metric("Volume", f"{vol:,.0f}", help="Number of shares traded in the latest period. Higher volume can indicate stronger buying or selling interest.")
         
         # RSI indicator with emoji
-        if "RSI" in df.columns:
-            rsi = latest["RSI"].values[0]
+        if pd.notna(latest["RSI"]):
+            rsi = latest["RSI"]
             if rsi > 70:
                 rsi_indicator = "🐂"
             elif rsi <= 30:
@@ -267,13 +280,13 @@ with tab3:
             st.metric("RSI", f"{rsi:.2f} {rsi_indicator}", help="Relative Strength Index (0–100). Above 70 may indicate overbought conditions. Below 30 may indicate oversold conditions.")
         
         # MACD
-        if "MACD" in df.columns:
-            macd = latest["MACD"].values[0]
+        if pd.notna(latest["MACD"]):
+            macd = latest["MACD"]
             st.metric("MACD", f"{macd:.4f}", help="Momentum indicator comparing two moving averages. Crossovers can suggest trend shifts.")
         
         # Optional: Line chart
         if st.checkbox("Show Price Chart"):
-            chart_data = df[["Close", "MA20", "MA50"]].tail(100)
+            chart_data = load_features(ticker)[["Close", "MA20", "MA50"]].tail(100)
             st.line_chart(chart_data)
 
     # RIGHT WINDOW - News & Sentiment Intelligence
@@ -297,10 +310,10 @@ with tab3:
                     "Volume": vol
                 }
                 
-                if "RSI" in df.columns:
-                    indicators["RSI"] = latest["RSI"].values[0]
-                if "MACD" in df.columns:
-                    indicators["MACD"] = latest["MACD"].values[0]
+                if pd.notna(latest["RSI"]):
+                    indicators["RSI"] = latest["RSI"]
+                if pd.notna(latest["MACD"]):
+                    indicators["MACD"] = latest["MACD"]
                 
                 # Run intelligence system
                 try:
@@ -388,7 +401,9 @@ with tab3:
 # ============================================================================
 # CHATBOT PAGE
 # ============================================================================
-with tab4:
+if view == VIEWS[3]:
+    from app.chatbot import AGENT_TOOLS, process_query
+
     st.header("🤖 AI Stock Analysis Chatbot")
     st.write("Powered by Finnhub API - Get real-time news, earnings, and sentiment analysis!")
 
@@ -494,7 +509,8 @@ with st.sidebar:
     st.header("📊 Market Overview")
     
     try:
-        market_data = get_market_summary()
+        snapshot = get_market_snapshot()
+        market_data = snapshot["stocks"]
         
         if market_data:
             st.caption("Top Stocks (Live)")
@@ -503,16 +519,37 @@ with st.sidebar:
                 ticker = stock['ticker']
                 price = stock['price']
                 change_pct = stock['change_pct']
+                as_of = f" :gray[(as of {stock['date']:%b %d})]" if stock['stale'] else ""
                     
                 if change_pct > 0:
-                    st.markdown(f"**{ticker}** ${price:.2f} :green[↑ {change_pct:+.2f}%]")
+                    st.markdown(f"**{ticker}** ${price:.2f} :green[↑ {change_pct:+.2f}%]{as_of}")
                 elif change_pct < 0:
-                    st.markdown(f"**{ticker}** ${price:.2f} :red[↓ {change_pct:+.2f}%]")
+                    st.markdown(f"**{ticker}** ${price:.2f} :red[↓ {change_pct:+.2f}%]{as_of}")
                 else:
-                    st.markdown(f"**{ticker}** ${price:.2f} :gray[→ {change_pct:.2f}%]")
-                
-            st.caption("🔄 Updates every 5 min")
+                    st.markdown(f"**{ticker}** ${price:.2f} :gray[→ {change_pct:.2f}%]{as_of}")
+            
+            stale = sorted(stock['ticker'] for stock in market_data if stock['stale'])
+            missing = sorted(set(snapshot["failures"]) - set(stale))
+            if stale:
+                st.caption(f"⚠️ Stored prices only (live update failed) for {', '.join(stale)}")
+            if missing:
+                st.caption(f"⚠️ No data for {', '.join(missing)}")
+            if snapshot["error"]:
+                st.caption(f"⚠️ Last refresh failed: {snapshot['error']}")
+            updated = f"Updated {snapshot['age_seconds'] / 60:.0f} min ago"
+            st.caption(f"🔄 {updated}, refreshing..." if snapshot["refreshing"] else f"🔄 {updated}, updates every 5 min")
         else:
             st.info("Market data unavailable")
     except Exception as e:
-        st.caption("⚠️ Market data unavailable")
\ No newline at end of file
+        st.caption("⚠️ Market data unavailable")
+
+# Debug panel last, so the stats include this run's loads
+with st.sidebar:
+    with st.expander("🛠️ Debug"):
+        loader_stats = feature_loader_stats()
+        st.caption("Feature loader cache")
+        st.json({
+            "calls": loader_stats["calls"],
+            "hits": loader_stats["calls"] - loader_stats["loads"],
+            "loads": loader_stats["loads"],
+        })
@@ -0,0 +1,98 @@
+"""
+Content-hash cache for feature engineering.
+A ticker's features are rebuilt only when the hash of its raw input, or
+the feature code version, differs from the one recorded at the last
+build. The code version hashes the source of every module that builds
+feature files (batch, registry, panel and streaming paths), so editing
+any of them invalidates the cache. The manifest lives next to the store
+as JSON.
+"""
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.store import STORE_ROOT, existing_path, has_frame
+from data.feature_registry import feature_version
+
+MANIFEST_PATH = os.path.join(STORE_ROOT, "feature_cache.json")
+
+# Modules whose code produces the stored feature files
+FEATURE_CODE = ["feature_engineering.py", "feature_registry.py", "panel_features.py", "indicator_engine.py"]
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version():
+    """Short hash of the feature-building source files and the registry definitions."""
+    digest = hashlib.sha256(feature_version().encode())
+    for name in FEATURE_CODE:
+        digest.update(file_hash(Path(__file__).parent / name).encode())
+    return digest.hexdigest()[:12]
+
+
+class FeatureCache:
+    """Tracks which tickers' feature files are current for their raw input."""
+
+    def __init__(self, path=MANIFEST_PATH, version=None):
+        self.path = path
+        self.version = version or code_version()
+        self.hits = 0
+        self.misses = 0
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def key(self, ticker):
+        raw_path = existing_path(ticker, "raw")
+        if raw_path is None:
+            raise FileNotFoundError(f"No raw data stored for {ticker}")
+        return f"{file_hash(raw_path)}:{self.version}"
+
+    def is_fresh(self, ticker):
+        """True if the stored features were built from the current raw input and code."""
+        fresh = has_frame(ticker, "features") and self.entries.get(ticker) == self.key(ticker)
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return fresh
+
+    def stale(self, tickers):
+        return [ticker for ticker in tickers if not self.is_fresh(ticker)]
+
+    def code_changed(self, ticker):
+        """True if the ticker's features were last built by different feature code (or never)."""
+        entry = self.entries.get(ticker)
+        return entry is None or entry.rsplit(":", 1)[-1] != self.version
+
+    def mark_built(self, ticker):
+        self.entries[ticker] = self.key(ticker)
+
+    def invalidate(self, ticker):
+        self.entries.pop(ticker, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,56 +1,76 @@
-import pandas as pd
-
-def calculate_rsi(series, period=14):
-    """Calculate RSI (Relative Strength Index)."""
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_macd(series, fast=12, slow=26, signal=9):
-    """Calculate MACD (Moving Average Convergence Divergence)."""
-    ema_fast = series.ewm(span=fast, adjust=False).mean()
-    ema_slow = series.ewm(span=slow, adjust=False).mean()
-    macd = ema_fast - ema_slow
-    macd_signal = macd.ewm(span=signal, adjust=False).mean()
-    macd_hist = macd - macd_signal
-    return macd, macd_signal, macd_hist
-
-def add_features(df):
-    # Ensure numeric columns
-    numeric_cols = ["Open", "High", "Low", "Close", "Volume"]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    # Feature engineering
-    df["MA20"] = df["Close"].rolling(window=20).mean()
-    df["MA50"] = df["Close"].rolling(window=50).mean()
-    df["Return"] = df["Close"].pct_change()
-    
-    # Add RSI
-    df["RSI"] = calculate_rsi(df["Close"], period=14)
-    
-    # Add MACD
-    df["MACD"], df["MACD_Signal"], df["MACD_Hist"] = calculate_macd(df["Close"])
-
-    # Target: next-day direction
-    df["Target"] = (df["Close"].shift(-1) > df["Close"]).astype(int)
+import argparse
+import sys
+from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.feature_registry import FEATURE_COLUMNS, compute_features
+from data.store import read_frame, universe, write_frame
+
+
+def add_features(df, columns=None):
+    """
+    Add feature columns to a raw OHLCV frame and drop incomplete rows.
+    The formulas live in data/feature_registry.py; only the features
+    `columns` depend on are computed (all stored columns by default).
+    """
+    df = compute_features(df, FEATURE_COLUMNS if columns is None else columns)
     df.dropna(inplace=True)
     return df
 
 if __name__ == "__main__":
-    tickers = ["AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "GE"]
+    from data.feature_cache import FeatureCache
+    from data.indicator_engine import clear_engine, update_features
+    from data.panel_features import add_features_panel
+
+    parser = argparse.ArgumentParser(description="Build feature files from raw data")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only compute features for bars added since the last run")
+    parser.add_argument("--panel", action="store_true",
+                        help="Compute all tickers in one vectorized date x ticker pass")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every ticker even if its raw input is unchanged")
+    parser.add_argument("--tickers", nargs="+", default=None,
+                        help="Tickers to process (default: every ticker with raw data)")
+    args = parser.parse_args()
+
+    tickers = args.tickers or universe("raw")
+    cache = FeatureCache()
+    if args.force:
+        stale = tickers
+    else:
+        stale = cache.stale(tickers)
     for ticker in tickers:
-        print(f"Processing {ticker}...")
-        df = pd.read_csv(f"data/{ticker}_raw.csv")
+        if ticker not in stale:
+            print(f"⏭️ {ticker} unchanged, skipping")
 
-        # Drop accidental index column if present
-        if "Unnamed: 0" in df.columns:
-            df.drop(columns=["Unnamed: 0"], inplace=True)
+    if args.panel and stale:
+        print(f"Processing {len(stale)} tickers as a panel...")
+        panel = add_features_panel({ticker: read_frame(ticker, "raw") for ticker in stale})
+        for ticker, df in panel.items():
+            write_frame(ticker, df, "features")
+            clear_engine(ticker)
+            cache.mark_built(ticker)
+            print(f"✅ {ticker} feature engineering complete")
+    else:
+        for ticker in stale:
+            print(f"Processing {ticker}...")
+            if args.incremental:
+                # Saved state from other feature code can't be extended; update_features
+                # itself rebuilds when already-consumed raw bars were revised
+                if cache.code_changed(ticker):
+                    clear_engine(ticker)
+                processed = update_features(ticker)
+                print(f"✅ {ticker} features updated ({processed} new bars)")
+            else:
+                df = read_frame(ticker, "raw")
+                df = add_features(df)
+                write_frame(ticker, df, "features")
+                # A full rebuild invalidates any saved streaming state
+                clear_engine(ticker)
+                print(f"✅ {ticker} feature engineering complete")
+            cache.mark_built(ticker)
 
-        df = add_features(df)
-        df.to_csv(f"data/{ticker}_features.csv", index=False)
-        print(f"✅ {ticker} feature engineering complete")
\ No newline at end of file
+    cache.save()
+    stats = cache.stats()
+    print(f"Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
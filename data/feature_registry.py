@@ -0,0 +1,161 @@
+"""
+Declarative feature registry.
+Each indicator declares its inputs, window and version; the planner
+resolves the dependency DAG for a requested set of columns so that only
+what a model needs is computed, and shared intermediates (e.g. the
+EWM12/EWM26 behind MACD) are computed once.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import pandas as pd
+
+RAW_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# Every column the feature files store, in order (see add_features)
+FEATURE_COLUMNS = ["MA20", "MA50", "Return", "RSI", "MACD", "MACD_Signal", "MACD_Hist", "Target"]
+
+# Columns the trend model uses, in order; optional ones are skipped when absent
+BASE_MODEL_FEATURES = ["MA20", "MA50", "Return", "Volume"]
+OPTIONAL_MODEL_FEATURES = ["RSI", "MACD", "MACD_Hist"]
+
+
+@dataclass(frozen=True)
+class Feature:
+    name: str
+    inputs: Tuple[str, ...]
+    compute: Callable[..., pd.Series]
+    window: Optional[int] = None
+    version: int = 1
+    intermediate: bool = False
+
+
+REGISTRY = {}
+
+
+def register(name, inputs, window=None, version=1, intermediate=False):
+    """Decorator adding a feature's compute function to the registry."""
+    def wrap(fn):
+        REGISTRY[name] = Feature(name, tuple(inputs), fn, window, version, intermediate)
+        return fn
+    return wrap
+
+
+@register("MA20", ["Close"], window=20)
+def _ma20(close):
+    return close.rolling(window=20).mean()
+
+
+@register("MA50", ["Close"], window=50)
+def _ma50(close):
+    return close.rolling(window=50).mean()
+
+
+@register("Return", ["Close"], window=2)
+def _return(close):
+    return close.pct_change()
+
+
+@register("RSI", ["Close"], window=14)
+def _rsi(close, period=14):
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+@register("EWM12", ["Close"], window=12, intermediate=True)
+def _ewm12(close):
+    return close.ewm(span=12, adjust=False).mean()
+
+
+@register("EWM26", ["Close"], window=26, intermediate=True)
+def _ewm26(close):
+    return close.ewm(span=26, adjust=False).mean()
+
+
+@register("MACD", ["EWM12", "EWM26"])
+def _macd(ema_fast, ema_slow):
+    return ema_fast - ema_slow
+
+
+@register("MACD_Signal", ["MACD"], window=9)
+def _macd_signal(macd):
+    return macd.ewm(span=9, adjust=False).mean()
+
+
+@register("MACD_Hist", ["MACD", "MACD_Signal"])
+def _macd_hist(macd, macd_signal):
+    return macd - macd_signal
+
+
+@register("Target", ["Close"])
+def _target(close):
+    return (close.shift(-1) > close).astype(int)
+
+
+def plan(columns):
+    """
+    Return the registered features needed for `columns`, in dependency
+    order. Raw columns are treated as already available.
+    """
+    order, seen = [], set()
+
+    def visit(name, path=()):
+        if name in RAW_COLUMNS or name in seen:
+            return
+        if name not in REGISTRY:
+            raise KeyError(f"Unknown feature: {name}")
+        if name in path:
+            raise ValueError(f"Feature cycle: {' -> '.join(path + (name,))}")
+        for dep in REGISTRY[name].inputs:
+            visit(dep, path + (name,))
+        seen.add(name)
+        order.append(name)
+
+    for col in columns:
+        visit(col)
+    return order
+
+
+def compute_features(df, columns):
+    """
+    Add the requested feature columns to a raw OHLCV frame.
+    Only the features in the plan for `columns` are computed; each
+    intermediate is computed once and not added to the output.
+    """
+    df = df.copy()
+    for col in RAW_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    values = {col: df[col] for col in RAW_COLUMNS if col in df.columns}
+    for name in plan(columns):
+        feature = REGISTRY[name]
+        values[name] = feature.compute(*(values[dep] for dep in feature.inputs))
+
+    for col in columns:
+        if col not in RAW_COLUMNS:
+            df[col] = values[col]
+    return df
+
+
+def select_features(columns):
+    """Model feature list supported by the given columns, in model order."""
+    return BASE_MODEL_FEATURES + [f for f in OPTIONAL_MODEL_FEATURES if f in columns]
+
+
+def feature_version(columns=None):
+    """
+    Short hash of the names, inputs, windows and versions behind `columns`
+    (all registered features by default). Changes whenever a definition
+    that the columns depend on is bumped.
+    """
+    names = plan(columns) if columns is not None else sorted(REGISTRY)
+    spec = ";".join(
+        f"{f.name}:{','.join(f.inputs)}:{f.window}:{f.version}"
+        for f in (REGISTRY[n] for n in names)
+    )
+    return hashlib.sha256(spec.encode()).hexdigest()[:12]
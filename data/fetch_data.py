@@ -1,15 +1,192 @@
+import argparse
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
 import yfinance as yf
- 
-def fetch_stock_data(ticker="AAPL", period="5y"):
-    df = yf.download(ticker, period=period)
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.store import DEFAULT_TICKERS, has_frame, read_frame, universe, write_frame
+
+TICKERS = list(DEFAULT_TICKERS)
+PRICE_COLS = ["Open", "High", "Low", "Close", "Volume"]
+NO_DATA = "no data returned"
+
+
+def fetch_stock_data(ticker="AAPL", period="5y", start=None):
+    if start is not None:
+        df = yf.download(ticker, start=start, progress=False)
+    else:
+        df = yf.download(ticker, period=period, progress=False)
     df.dropna(inplace=True)
     return df
- 
-if __name__ == "__main__":
-    tickers = ["AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "GE"]
+
+
+def to_raw_frame(df):
+    """Flatten a yfinance download into a Date + OHLCV frame."""
+    if isinstance(df.columns, pd.MultiIndex):
+        # Single-ticker downloads come back as (Price, Ticker) columns
+        df = df.droplevel(-1, axis=1)
+    df = df.reset_index()
+    df.columns.name = None
+    df["Date"] = pd.to_datetime(df["Date"]).dt.tz_localize(None)
+    return df[["Date"] + [c for c in PRICE_COLS if c in df.columns]]
+
+
+def last_stored_date(ticker):
+    """Return the most recent stored Date for a ticker, or None."""
+    if not has_frame(ticker, "raw"):
+        return None
+    df = read_frame(ticker, "raw", columns=["Date"])
+    if df.empty:
+        return None
+    return df["Date"].max()
+
+
+def merge_raw(existing, new):
+    """Append new bars to existing ones, keeping the latest copy of each Date."""
+    merged = pd.concat([existing, new], ignore_index=True)
+    merged = merged.drop_duplicates(subset="Date", keep="last")
+    return merged.sort_values("Date").reset_index(drop=True)
+
+
+def next_start(ticker):
+    """
+    Return the date to resume downloading from, or None when no file exists.
+    This is the last stored date itself: a bar stored while its session was
+    still open is downloaded again and replaced by merge_raw.
+    """
+    last_date = last_stored_date(ticker)
+    if last_date is None:
+        return None
+    return last_date.normalize()
+
+
+def store_bars(ticker, new):
+    """Merge new raw bars into the ticker's stored raw data and return the number added."""
+    if not has_frame(ticker, "raw"):
+        write_frame(ticker, new, "raw")
+        return len(new)
+    existing = read_frame(ticker, "raw")
+    merged = merge_raw(existing, new)
+    write_frame(ticker, merged, "raw")
+    return len(merged) - len(existing)
+
+
+def fetch_incremental(ticker, period="5y"):
+    """
+    Bring the ticker's stored raw data up to date.
+    Bars from the last stored Date on are requested (the last one is
+    refreshed); a ticker with no stored file gets a full `period` download.
+    Returns the number of new bars written.
+    """
+    start = next_start(ticker)
+    if start is None:
+        new = fetch_stock_data(ticker, period=period)
+    else:
+        new = fetch_stock_data(ticker, start=start.strftime("%Y-%m-%d"))
+    if new.empty:
+        return 0
+    return store_bars(ticker, to_raw_frame(new))
+
+
+def _download_group(group, period, start):
+    """Download one group of tickers in a single request and split it per ticker."""
+    kwargs = {"start": start} if start is not None else {"period": period}
+    wide = yf.download(group, group_by="ticker", threads=False, progress=False, **kwargs)
+
+    frames, failures = {}, {}
+    available = set(wide.columns.get_level_values(0)) if isinstance(wide.columns, pd.MultiIndex) else set()
+    for ticker in group:
+        if ticker not in available:
+            failures[ticker] = NO_DATA
+            continue
+        df = wide[ticker].dropna()
+        if df.empty:
+            failures[ticker] = NO_DATA
+            continue
+        frames[ticker] = to_raw_frame(df)
+    return frames, failures
+
+
+def fetch_batch(tickers, period="5y", start=None, group_size=50, max_workers=4):
+    """
+    Download a whole universe with grouped multi-ticker requests.
+    Groups of `group_size` symbols are fetched on a pool of at most
+    `max_workers` threads. A failing ticker (or group) is reported in
+    `failures` instead of aborting the run.
+    Returns (frames, failures): {ticker: raw frame} and {ticker: reason}.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    groups = [tickers[i:i + group_size] for i in range(0, len(tickers), group_size)]
+    frames, failures = {}, {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_download_group, group, period, start): group for group in groups}
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                group_frames, group_failures = future.result()
+            except Exception as e:
+                group_frames, group_failures = {}, {t: str(e) for t in group}
+            frames.update(group_frames)
+            failures.update(group_failures)
+
+    return frames, failures
+
+
+def update_universe(tickers, full=False, period="5y", group_size=50, max_workers=4):
+    """
+    Refresh raw files for every ticker using batched downloads.
+    Tickers are bucketed by their resume date (the last stored date, so
+    the last bar is refreshed) so that each batch request covers only the
+    range its symbols need. Since every incremental request includes the
+    last stored bar, a ticker that comes back empty (delisted, renamed,
+    rate-limited) is reported in `failures`.
+    Returns (added, failures): {ticker: new bars} and {ticker: reason}.
+    """
+    buckets = defaultdict(list)
     for ticker in tickers:
-        print(f"Fetching {ticker}...")
-        df = fetch_stock_data(ticker)
-        df.reset_index(inplace=True)  # Convert Date index to column
-        df.to_csv(f"data/{ticker}_raw.csv", index=False)
-        print(f"✅ {ticker} data saved")
+        start = None if full else next_start(ticker)
+        buckets[start].append(ticker)
+
+    added, failures = {}, {}
+    for start, group in buckets.items():
+        start_str = start.strftime("%Y-%m-%d") if start is not None else None
+        frames, group_failures = fetch_batch(group, period=period, start=start_str,
+                                             group_size=group_size, max_workers=max_workers)
+        failures.update(group_failures)
+        for ticker, df in frames.items():
+            if full:
+                write_frame(ticker, df, "raw")
+                added[ticker] = len(df)
+            else:
+                added[ticker] = store_bars(ticker, df)
+
+    return added, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download raw OHLCV data")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-download the full history instead of appending new bars")
+    parser.add_argument("--tickers", nargs="+", default=None,
+                        help="Ticker universe to refresh (default: every stored ticker)")
+    parser.add_argument("--group-size", type=int, default=50,
+                        help="Symbols per multi-ticker request")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Maximum concurrent download requests")
+    args = parser.parse_args()
+    args.tickers = args.tickers or universe("raw")
+
+    print(f"Fetching {len(args.tickers)} tickers...")
+    added, failures = update_universe(args.tickers, full=args.full,
+                                      group_size=args.group_size, max_workers=args.workers)
+    for ticker in args.tickers:
+        if ticker in failures:
+            print(f"❌ {ticker} failed: {failures[ticker]}")
+        else:
+            print(f"✅ {ticker} up to date (+{added.get(ticker, 0)} bars)")
@@ -0,0 +1,173 @@
+"""
+Price data providers.
+Callers ask a provider for daily OHLCV bars instead of calling yfinance
+directly:
+
+- LocalStoreProvider serves the raw bars already ingested into the store.
+- RemoteProvider downloads with batched yfinance requests.
+- LocalFirstProvider (the default) serves stored bars and only downloads
+  the tail from the last stored date on, or the whole range for tickers
+  that are not ingested. With offline=True it never touches the network.
+  A stored ticker whose tail download fails still gets its stored bars,
+  and is reported in `failures` with a reason starting with STALE.
+
+Set PRICE_DATA_OFFLINE=1 to make the default provider offline, or
+install another provider with set_provider().
+"""
+import os
+from abc import ABC, abstractmethod
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.store import has_frame, read_frame
+
+STALE = "stale: remote tail failed"
+
+
+def _slice(df, start=None, end=None):
+    if start is not None:
+        df = df[df["Date"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["Date"] <= pd.Timestamp(end)]
+    return df.reset_index(drop=True)
+
+
+class PriceProvider(ABC):
+    """Daily OHLCV bars as Date + Open/High/Low/Close/Volume frames."""
+
+    @abstractmethod
+    def history_many(self, tickers, start=None, end=None):
+        """Returns (frames, failures): {ticker: bars} and {ticker: reason}."""
+
+    def history(self, ticker, start=None, end=None):
+        frames, failures = self.history_many([ticker], start, end)
+        if ticker not in frames:
+            raise ValueError(f"No data found for {ticker}: {failures.get(ticker, 'unknown error')}")
+        return frames[ticker]
+
+
+class LocalStoreProvider(PriceProvider):
+    """Bars from the local raw data store only."""
+
+    def history_many(self, tickers, start=None, end=None):
+        frames, failures = {}, {}
+        for ticker in tickers:
+            if not has_frame(ticker, "raw"):
+                failures[ticker] = "not in the local store"
+                continue
+            frames[ticker] = _slice(read_frame(ticker, "raw"), start, end)
+        return frames, failures
+
+
+class RemoteProvider(PriceProvider):
+    """Bars downloaded with grouped multi-ticker yfinance requests."""
+
+    def __init__(self, period="5y", group_size=50, max_workers=4):
+        self.period = period
+        self.group_size = group_size
+        self.max_workers = max_workers
+
+    def history_many(self, tickers, start=None, end=None):
+        from data.fetch_data import fetch_batch
+
+        start_str = pd.Timestamp(start).strftime("%Y-%m-%d") if start is not None else None
+        frames, failures = fetch_batch(tickers, period=self.period, start=start_str,
+                                       group_size=self.group_size, max_workers=self.max_workers)
+        return {t: _slice(df, start, end) for t, df in frames.items()}, failures
+
+
+class LocalFirstProvider(PriceProvider):
+    """
+    Stored bars plus a remote tail.
+    Only bars from each ticker's last stored date on are downloaded, that
+    bar included since it may be partial (tickers with the same gap share
+    one batched request); downloaded tails are
+    kept in memory for `tail_ttl` seconds. Tickers missing from the store
+    are downloaded in full. Offline, stored bars are returned as they are.
+    The tail always includes the last stored bar, so an empty tail is a
+    failure: the stored bars are returned, the ticker is reported as
+    STALE in `failures`, and nothing is cached.
+    """
+
+    def __init__(self, offline=False, remote=None, tail_ttl=300):
+        self.offline = offline
+        self.local = LocalStoreProvider()
+        self.remote = remote or RemoteProvider()
+        self.tail_ttl = tail_ttl
+        self._tails = {}  # (ticker, tail start) -> (fetched_at, bars)
+        self._lock = threading.Lock()
+        self.remote_requests = 0
+
+    def _cached_tail(self, ticker, tail_start):
+        with self._lock:
+            entry = self._tails.get((ticker, tail_start))
+        if entry is not None and time.time() - entry[0] <= self.tail_ttl:
+            return entry[1]
+        return None
+
+    def history_many(self, tickers, start=None, end=None):
+        from data.fetch_data import merge_raw
+
+        frames, failures = self.local.history_many(tickers, start, end)
+        if self.offline:
+            for ticker in failures:
+                failures[ticker] = "not in the local store (offline)"
+            return frames, failures
+
+        today = pd.Timestamp.now().normalize()
+        end_ts = pd.Timestamp(end) if end is not None else None
+        buckets = defaultdict(list)
+        for ticker in tickers:
+            if ticker in frames:
+                stored = read_frame(ticker, "raw", columns=["Date"])["Date"]
+                # The last stored bar may have been stored mid-session: fetch it again
+                tail_start = stored.max().normalize()
+                if tail_start > today or (end_ts is not None and tail_start > end_ts):
+                    continue
+                tail_start = max(tail_start, pd.Timestamp(start)) if start is not None else tail_start
+            else:
+                tail_start = pd.Timestamp(start) if start is not None else None
+            cached = self._cached_tail(ticker, tail_start)
+            if cached is not None:
+                frames[ticker] = merge_raw(frames.get(ticker, cached.iloc[:0]), cached)
+            else:
+                buckets[tail_start].append(ticker)
+
+        for tail_start, group in buckets.items():
+            self.remote_requests += 1
+            tails, group_failures = self.remote.history_many(group, tail_start, end)
+            now = time.time()
+            for ticker in group:
+                if ticker in tails:
+                    with self._lock:
+                        self._tails[(ticker, tail_start)] = (now, tails[ticker])
+                    frames[ticker] = merge_raw(frames[ticker], tails[ticker]) if ticker in frames else tails[ticker]
+                    failures.pop(ticker, None)
+                elif ticker in frames:
+                    failures[ticker] = f"{STALE} ({group_failures.get(ticker, 'no data returned')})"
+                else:
+                    failures[ticker] = group_failures.get(ticker, "no data returned")
+        return {t: _slice(df, start, end) for t, df in frames.items()}, failures
+
+
+_provider = None
+
+
+def get_provider():
+    """Process-wide provider: local-first, offline when PRICE_DATA_OFFLINE=1."""
+    global _provider
+    if _provider is None:
+        _provider = LocalFirstProvider(offline=os.getenv("PRICE_DATA_OFFLINE", "0") == "1")
+    return _provider
+
+
+def set_provider(provider):
+    global _provider
+    _provider = provider
@@ -0,0 +1,159 @@
+"""
+Columnar storage for raw and feature data.
+Each ticker gets one zstd-compressed Parquet file per kind, partitioned
+hive-style so the whole store can also be scanned as one dataset:
+
+    data/store/raw/ticker=AAPL/data.parquet
+    data/store/features/ticker=AAPL/data.parquet
+
+Reads support column projection and memory mapping. When a ticker has
+not been migrated yet, the legacy data/{ticker}_{kind}.csv is used.
+"""
+import argparse
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+STORE_ROOT = "data/store"
+KINDS = ("raw", "features")
+DEFAULT_TICKERS = ("AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "GE")
+INT_COLS = ("Volume", "Target")
+
+
+def store_path(ticker, kind="features"):
+    return os.path.join(STORE_ROOT, kind, f"ticker={ticker}", "data.parquet")
+
+
+def legacy_csv_path(ticker, kind="features"):
+    return f"data/{ticker}_{kind}.csv"
+
+
+def read_csv_compat(path):
+    """
+    Read a CSV written by earlier versions of the pipeline.
+    Handles the stray index column and yfinance's multi-row header
+    (Price/Ticker/Date), where the date column ended up named "Price".
+    """
+    df = pd.read_csv(path)
+    if "Unnamed: 0" in df.columns:
+        df.drop(columns=["Unnamed: 0"], inplace=True)
+    if "Date" not in df.columns and "Price" in df.columns:
+        df.rename(columns={"Price": "Date"}, inplace=True)
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df = df.dropna(subset=["Date"])
+    for col in df.columns.drop("Date"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df.reset_index(drop=True)
+
+
+def _typed(df):
+    """Normalize dtypes before writing: datetime Date, int64 counts, float64 elsewhere."""
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"])
+    for col in df.columns.drop("Date"):
+        if col in INT_COLS and df[col].notna().all():
+            df[col] = df[col].astype("int64")
+        else:
+            df[col] = df[col].astype("float64")
+    return df.reset_index(drop=True)
+
+
+def write_frame(ticker, df, kind="features"):
+    """Write a ticker's frame to the columnar store."""
+    path = store_path(ticker, kind)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(_typed(df), preserve_index=False)
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+def frame_digest(df):
+    """Short content hash of a frame's rows (index ignored), to detect revised bars."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()[:16]
+
+
+def available_columns(ticker, kind="features"):
+    """List stored columns without reading any data."""
+    path = store_path(ticker, kind)
+    if os.path.exists(path):
+        return pq.read_schema(path).names
+    csv_path = legacy_csv_path(ticker, kind)
+    if os.path.exists(csv_path):
+        return list(read_csv_compat(csv_path).columns)
+    raise FileNotFoundError(f"No {kind} data stored for {ticker}")
+
+
+def read_frame(ticker, kind="features", columns=None):
+    """
+    Read a ticker's frame.
+    `columns` projects the read to the requested columns (plus Date);
+    requested columns that are not stored are skipped, so callers can
+    keep probing `df.columns` for optional indicators.
+    Raises FileNotFoundError when neither Parquet nor legacy CSV exists.
+    """
+    path = store_path(ticker, kind)
+    if os.path.exists(path):
+        if columns is not None:
+            stored = pq.read_schema(path).names
+            columns = ["Date"] + [c for c in columns if c in stored and c != "Date"]
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    csv_path = legacy_csv_path(ticker, kind)
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"No {kind} data stored for {ticker}")
+    df = read_csv_compat(csv_path)
+    if columns is not None:
+        df = df[["Date"] + [c for c in columns if c in df.columns and c != "Date"]]
+    return df
+
+
+def existing_path(ticker, kind="features"):
+    """Path of the file a read would use (Parquet first, then legacy CSV), or None."""
+    for path in (store_path(ticker, kind), legacy_csv_path(ticker, kind)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def has_frame(ticker, kind="features"):
+    return existing_path(ticker, kind) is not None
+
+
+def list_tickers(kind="features"):
+    """Tickers present in the columnar store for a kind."""
+    root = os.path.join(STORE_ROOT, kind)
+    if not os.path.isdir(root):
+        return []
+    return sorted(name.split("=", 1)[1] for name in os.listdir(root) if name.startswith("ticker="))
+
+
+def universe(kind="features"):
+    """Tickers stored for a kind, or the default universe before anything is stored."""
+    return list_tickers(kind) or list(DEFAULT_TICKERS)
+
+
+def migrate_csv(tickers, kinds=KINDS):
+    """Convert legacy per-ticker CSV files into the columnar store."""
+    migrated = []
+    for ticker in tickers:
+        for kind in kinds:
+            csv_path = legacy_csv_path(ticker, kind)
+            if os.path.exists(csv_path):
+                write_frame(ticker, read_csv_compat(csv_path), kind)
+                migrated.append((ticker, kind))
+    return migrated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate legacy CSV files into the columnar store")
+    parser.add_argument("--tickers", nargs="+", default=list(DEFAULT_TICKERS))
+    args = parser.parse_args()
+
+    for ticker, kind in migrate_csv(args.tickers):
+        print(f"✅ {ticker} {kind} migrated to {store_path(ticker, kind)}")
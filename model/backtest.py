@@ -0,0 +1,219 @@
+"""
+Walk-forward backtest of the trend model.
+Each ticker's history is cut into consecutive test blocks; for every
+block a forest is fitted on the bars before it (an expanding window from
+the start, or a rolling window of fixed length) and the whole block is
+scored in one call. Folds run across a process pool, and fitted fold
+models are cached as flat forests keyed by a hash of their training data
+and parameters, so re-running with new metrics does not refit:
+
+    model/backtest_cache/{ticker}/{key}.npz
+
+Results are also broken down by volatility regime (see
+utils/volatility_analyzer.volatility_regime_history).
+
+Usage: python model/backtest.py [--mode expanding|rolling] [--train-bars 500] [--test-bars 60]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.store import read_frame, universe
+from data.feature_registry import BASE_MODEL_FEATURES, OPTIONAL_MODEL_FEATURES, select_features
+from model.flat_forest import FlatForest
+
+CACHE_ROOT = Path(__file__).parent / "backtest_cache"
+DEFAULT_PARAMS = {"n_estimators": 100, "random_state": 42}
+
+
+def make_folds(n_bars, train_bars=500, test_bars=60, mode="expanding"):
+    """
+    (train_start, test_start, test_end) positions for each fold.
+    The first fold trains on `train_bars` bars; expanding folds then keep
+    every earlier bar, rolling folds keep only the last `train_bars`.
+    """
+    if mode not in ("expanding", "rolling"):
+        raise ValueError(f"Unknown walk-forward mode {mode}")
+    folds = []
+    for test_start in range(train_bars, n_bars, test_bars):
+        train_start = 0 if mode == "expanding" else test_start - train_bars
+        folds.append((train_start, test_start, min(test_start + test_bars, n_bars)))
+    return folds
+
+
+def fold_key(X_train, y_train, feature_cols, params):
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"features": feature_cols, "params": params}, sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(X_train).tobytes())
+    digest.update(np.ascontiguousarray(y_train).tobytes())
+    return digest.hexdigest()[:20]
+
+
+def run_fold(ticker, X_train, y_train, X_test, feature_cols, params, use_cache=True):
+    """Fit (or load) one fold model and score its test block. Returns (probabilities, cache_hit)."""
+    path = CACHE_ROOT / ticker / f"{fold_key(X_train, y_train, feature_cols, params)}.npz"
+    if use_cache and path.exists():
+        return FlatForest.load(path).predict_proba(X_test)[:, 1], True
+
+    model = RandomForestClassifier(n_jobs=1, **params)
+    model.fit(pd.DataFrame(X_train, columns=feature_cols), y_train)
+    forest = FlatForest.from_sklearn(model)
+    if use_cache:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".npz.tmp")
+        forest.save(tmp_path)
+        os.replace(tmp_path, path)
+    return forest.predict_proba(X_test)[:, 1], False
+
+
+def load_backtest_frame(ticker):
+    """Feature rows with the next-day return each Target refers to; the last bar has none and is dropped."""
+    df = read_frame(ticker, columns=["Close", "Target"] + BASE_MODEL_FEATURES + OPTIONAL_MODEL_FEATURES)
+    df["NextReturn"] = df["Close"].shift(-1) / df["Close"] - 1
+    return df.iloc[:-1].reset_index(drop=True)
+
+
+def run_backtest(tickers, train_bars=500, test_bars=60, mode="expanding", params=None,
+                 max_workers=None, use_cache=True):
+    """
+    Walk-forward predictions for every ticker, folds spread across processes.
+    Returns (predictions, cache_hits): one row per out-of-sample bar with
+    Ticker, Date, ProbUp, Target and NextReturn.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    frames, tasks = {}, []
+    for ticker in tickers:
+        df = load_backtest_frame(ticker)
+        feature_cols = select_features(df.columns)
+        X = df[feature_cols].to_numpy(dtype=np.float64)
+        y = df["Target"].to_numpy()
+        frames[ticker] = df
+        for train_start, test_start, test_end in make_folds(len(df), train_bars, test_bars, mode):
+            tasks.append((ticker, test_start, test_end, X[train_start:test_start], y[train_start:test_start],
+                          X[test_start:test_end], feature_cols))
+
+    probs = {ticker: np.full(len(df), np.nan) for ticker, df in frames.items()}
+    cache_hits = 0
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks) or 1))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_fold, ticker, X_train, y_train, X_test, feature_cols, params, use_cache):
+                (ticker, test_start, test_end)
+            for ticker, test_start, test_end, X_train, y_train, X_test, feature_cols in tasks
+        }
+        for future in as_completed(futures):
+            ticker, test_start, test_end = futures[future]
+            fold_probs, hit = future.result()
+            probs[ticker][test_start:test_end] = fold_probs
+            cache_hits += hit
+
+    parts = []
+    for ticker, df in frames.items():
+        scored = df.assign(Ticker=ticker, ProbUp=probs[ticker])[["Ticker", "Date", "ProbUp", "Target", "NextReturn"]]
+        parts.append(scored.dropna(subset=["ProbUp"]))
+    return pd.concat(parts, ignore_index=True), cache_hits
+
+
+def equity_curves(predictions):
+    """Long/flat strategy (long when ProbUp > 0.5) and buy-and-hold equity, per ticker."""
+    long = (predictions["ProbUp"] > 0.5).astype(float)
+    curves = predictions[["Ticker", "Date"]].copy()
+    curves["Strategy"] = (1 + long * predictions["NextReturn"]).groupby(predictions["Ticker"]).cumprod()
+    curves["BuyHold"] = (1 + predictions["NextReturn"]).groupby(predictions["Ticker"]).cumprod()
+    return curves
+
+
+def calibration(predictions, bins=10):
+    """Mean predicted probability against the observed up-rate, per probability bin."""
+    edges = np.linspace(0, 1, bins + 1)
+    bucket = pd.cut(predictions["ProbUp"], edges, include_lowest=True)
+    table = predictions.groupby(bucket, observed=True).agg(
+        predicted=("ProbUp", "mean"), observed=("Target", "mean"), count=("Target", "size")
+    )
+    return table.reset_index(names="bin")
+
+
+def summarize(predictions):
+    """Hit rate, Brier score and final equity per ticker."""
+    curves = equity_curves(predictions)
+    hit = (predictions["ProbUp"] > 0.5).astype(int) == predictions["Target"]
+    brier = (predictions["ProbUp"] - predictions["Target"]) ** 2
+    by_ticker = predictions["Ticker"]
+    summary = pd.DataFrame({
+        "bars": by_ticker.value_counts(sort=False),
+        "hit_rate": hit.groupby(by_ticker).mean(),
+        "up_rate": predictions["Target"].groupby(by_ticker).mean(),
+        "brier": brier.groupby(by_ticker).mean(),
+        "strategy": curves.groupby("Ticker")["Strategy"].last() - 1,
+        "buy_hold": curves.groupby("Ticker")["BuyHold"].last() - 1,
+    })
+    return summary
+
+
+def regime_summary(predictions, window=252):
+    """
+    Hit rate and long/flat return per volatility regime (expansion,
+    compression, mixed), from each ticker's stored closes as of every
+    predicted bar. Bars before RV90 is available are left out.
+    """
+    from utils.volatility_analyzer import realized_volatility, volatility_regime_history
+
+    parts = []
+    for ticker in predictions["Ticker"].unique():
+        closes = read_frame(ticker, "raw", columns=["Close"]).set_index("Date")["Close"]
+        history = volatility_regime_history(realized_volatility(closes), window)
+        parts.append(history[["regime", "RV30_pct"]].assign(Ticker=ticker).rename_axis("Date").reset_index())
+    scored = predictions.merge(pd.concat(parts, ignore_index=True), on=["Ticker", "Date"], how="inner")
+    scored = scored.dropna(subset=["regime"])
+
+    long = (scored["ProbUp"] > 0.5).astype(float)
+    scored = scored.assign(hit=((scored["ProbUp"] > 0.5).astype(int) == scored["Target"]),
+                           strategy=long * scored["NextReturn"])
+    return scored.groupby("regime").agg(
+        bars=("hit", "size"), hit_rate=("hit", "mean"), up_rate=("Target", "mean"),
+        rv30_pct=("RV30_pct", "mean"), strategy=("strategy", "mean"), buy_hold=("NextReturn", "mean"),
+    )
+
+
+if __name__ == "__main__":
+    import time
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the trend model")
+    parser.add_argument("--tickers", nargs="+", default=None, help="Default: every ticker with features")
+    parser.add_argument("--mode", choices=["expanding", "rolling"], default="expanding")
+    parser.add_argument("--train-bars", type=int, default=500, help="Initial (expanding) or fixed (rolling) window")
+    parser.add_argument("--test-bars", type=int, default=60, help="Bars predicted per fold")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-cache", action="store_true", help="Refit every fold and do not store fold models")
+    parser.add_argument("--output", default=None, help="Write per-bar predictions to this CSV")
+    args = parser.parse_args()
+    args.tickers = args.tickers or universe("features")
+
+    start = time.perf_counter()
+    predictions, cache_hits = run_backtest(args.tickers, args.train_bars, args.test_bars, args.mode,
+                                           max_workers=args.workers, use_cache=not args.no_cache)
+    elapsed = time.perf_counter() - start
+    n_folds = sum(len(make_folds(len(load_backtest_frame(t)), args.train_bars, args.test_bars, args.mode))
+                  for t in args.tickers)
+
+    pd.set_option("display.width", 120)
+    print(f"Walk-forward ({args.mode}, train {args.train_bars}, test {args.test_bars}): "
+          f"{n_folds} folds, {cache_hits} cached, {elapsed:.1f}s\n")
+    print(summarize(predictions).to_string(float_format=lambda x: f"{x:.3f}"))
+    print("\nBy volatility regime (mean daily returns):")
+    print(regime_summary(predictions).to_string(float_format=lambda x: f"{x:.4f}"))
+    print("\nCalibration (all tickers):")
+    print(calibration(predictions).to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    if args.output:
+        predictions.to_csv(args.output, index=False)
+        print(f"\n✅ Predictions saved to {args.output}")
@@ -0,0 +1,92 @@
+"""
+Nightly batch scoring.
+Scores the latest feature row of every ticker in one pass and writes a
+compact prediction table that the app reads instead of running models:
+
+    data/store/predictions/data.parquet
+
+One row per ticker: as-of date, trend, confidence, the model that
+produced it and the indicators shown next to the prediction.
+Run after feature engineering (and training):
+
+    python model/batch_predict.py
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.store import STORE_ROOT, read_frame, universe
+from data.feature_registry import BASE_MODEL_FEATURES, OPTIONAL_MODEL_FEATURES
+from model.predict import LEGACY_MODEL_ID, model_path, predict_trend_batch
+from model.registry import load_metadata
+
+PREDICTIONS_PATH = os.path.join(STORE_ROOT, "predictions", "data.parquet")
+INDICATOR_COLS = ["Close", "MA20", "MA50", "Return", "Volume", "RSI", "MACD"]
+
+
+def model_version(model_id):
+    """Training timestamp of a model, used to tell stale predictions apart."""
+    if model_id == LEGACY_MODEL_ID:
+        return pd.Timestamp(os.path.getmtime(model_path), unit="s").isoformat(timespec="seconds")
+    meta = load_metadata(model_id)
+    return meta.get("retrained_at") or meta.get("trained_at")
+
+
+def build_prediction_table(tickers):
+    """Latest prediction per ticker, scored with one predict_proba call per model."""
+    columns = list(dict.fromkeys(INDICATOR_COLS + BASE_MODEL_FEATURES + OPTIONAL_MODEL_FEATURES))
+    latest = []
+    for ticker in tickers:
+        row = read_frame(ticker, columns=columns).tail(1).reindex(columns=["Date"] + columns)
+        row["Ticker"] = ticker
+        latest.append(row)
+    latest = pd.concat(latest, ignore_index=True)
+
+    scores = predict_trend_batch(latest, latest["Ticker"])
+    versions = {model_id: model_version(model_id) for model_id in scores["model_id"].unique()}
+    table = pd.DataFrame({
+        "Ticker": latest["Ticker"],
+        "Date": latest["Date"],
+        "Trend": scores["trend"],
+        "Confidence": scores["confidence"],
+        "ModelId": scores["model_id"],
+        "ModelVersion": scores["model_id"].map(versions),
+    })
+    return pd.concat([table, latest[INDICATOR_COLS].astype("float64")], axis=1)
+
+
+def write_prediction_table(table, path=PREDICTIONS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    pq.write_table(pa.Table.from_pandas(table, preserve_index=False), tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_predictions(path=PREDICTIONS_PATH):
+    """Prediction table as {ticker: record} for O(1) lookups; empty if not built yet."""
+    if not os.path.exists(path):
+        return {}
+    table = pq.read_table(path, memory_map=True).to_pandas()
+    return {record["Ticker"]: record for record in table.to_dict("records")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score every ticker and write the prediction table")
+    parser.add_argument("--tickers", nargs="+", default=None, help="Default: every ticker with features")
+    args = parser.parse_args()
+
+    tickers = args.tickers or universe("features")
+    table = build_prediction_table(tickers)
+    path = write_prediction_table(table)
+    for record in table.to_dict("records"):
+        print(f"✅ {record['Ticker']} {record['Date'].date()}: {record['Trend']} "
+              f"({record['Confidence']}%) via {record['ModelId']}")
+    print(f"✅ Prediction table saved to {path}")
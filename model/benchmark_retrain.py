@@ -0,0 +1,43 @@
+"""
+Compare warm-start incremental retraining against a full refit.
+For each registered model, times an incremental refresh (new trees fitted
+on the last training-split bars added to the registered forest) and a full refit with its
+registered parameters and features and the refreshed forest's tree
+count, and reports holdout accuracy for both. Nothing is saved.
+Models already refreshed by `train_model.py --incremental` are skipped:
+their newest trees were fitted on the holdout bars.
+
+Usage: python model/benchmark_retrain.py [--recent-bars 250] [--new-trees 20] [--max-trees 100]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from model.registry import list_models, load_metadata
+from model.train_model import fit_model, retrain_incremental
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark incremental retraining vs full refit")
+    parser.add_argument("--recent-bars", type=int, default=250)
+    parser.add_argument("--new-trees", type=int, default=20)
+    parser.add_argument("--max-trees", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'model':<10}{'full fit':>10}{'full acc':>10}{'incr fit':>10}{'incr acc':>10}{'speedup':>9}")
+    for model_id in list_models():
+        meta = load_metadata(model_id)
+        if meta.get("refreshes") and not meta.get("retrain_holdout"):
+            # Trees from a production refresh were fitted on the newest bars, i.e. the holdout
+            print(f"⚠️ {model_id} skipped: refreshed on holdout bars, run train_model.py without "
+                  f"--incremental to benchmark it")
+            continue
+        _, incr = retrain_incremental(model_id, recent_bars=args.recent_bars, new_trees=args.new_trees,
+                                      max_trees=args.max_trees, save=False, holdout=True)
+        # Refit the same model: registered parameters and features, the refreshed forest's tree count
+        params = {**meta.get("params", {}), "features": meta["features"], "n_estimators": incr["n_estimators"]}
+        full = fit_model(model_id, meta["tickers"], save=False, params=params)
+        speedup = full["fit_seconds"] / max(incr["fit_seconds"], 1e-9)
+        print(f"{model_id:<10}{full['fit_seconds']:>9.3f}s{full['accuracy']:>10.2%}"
+              f"{incr['fit_seconds']:>9.3f}s{incr['accuracy']:>10.2%}{speedup:>8.1f}x")
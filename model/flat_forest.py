@@ -0,0 +1,198 @@
+"""
+Flat-array random forest for fast inference.
+All trees of a fitted RandomForestClassifier are concatenated into
+contiguous NumPy arrays (feature, threshold, children, leaf
+probabilities) and evaluated level by level with vectorized NumPy, which
+avoids sklearn's per-call validation and thread dispatch when scoring
+one row or a small batch. Probabilities match predict_proba.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class FlatForest:
+    """A random forest classifier stored as flat arrays."""
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots,
+                 max_depth, classes, feature_names):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.feature_names_in_ = feature_names
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted single-output RandomForestClassifier."""
+        n_classes = len(model.classes_)
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point at themselves so extra iterations are no-ops
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+            threshold = np.where(is_leaf, np.inf, tree.threshold)
+            if hasattr(tree, "missing_go_to_left"):
+                missing_left = tree.missing_go_to_left.astype(bool)
+            else:
+                missing_left = np.zeros(n_nodes, dtype=bool)
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :n_classes].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(left)
+            rights.append(right)
+            missing.append(missing_left)
+            values.append(proba)
+            roots.append(offset)
+            offset += n_nodes
+
+        feature_names = getattr(model, "feature_names_in_", None)
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max(e.tree_.max_depth for e in model.estimators_),
+            classes=np.asarray(model.classes_),
+            feature_names=None if feature_names is None else np.asarray(feature_names, dtype=object),
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def _as_array(self, X):
+        if isinstance(X, pd.DataFrame) and self.feature_names_in_ is not None:
+            X = X[list(self.feature_names_in_)]
+        # sklearn trees compare float32 inputs against float64 thresholds
+        return np.asarray(X, dtype=np.float32).astype(np.float64)
+
+    def apply(self, X):
+        """Leaf index (into the flat arrays) for every row and tree."""
+        X = self._as_array(X)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        nodes = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows) * n_features, len(self.roots))
+
+        # Walk only the (row, tree) paths that have not reached a leaf yet
+        active = np.arange(nodes.size)
+        for _ in range(self.max_depth):
+            current = nodes[active]
+            x = flat_X[row_offset[active] + self.feature[current]]
+            go_left = (x <= self.threshold[current]) | (np.isnan(x) & self.missing_left[current])
+            nxt = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = nxt
+            moving = nxt != current
+            active = active[moving]
+            if active.size == 0:
+                break
+        return nodes.reshape(n_rows, len(self.roots))
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[0], self.value.shape[1]))
+        # Accumulate tree by tree, in the same order as sklearn
+        for t in range(leaves.shape[1]):
+            proba += self.value[leaves[:, t]]
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                missing_left=self.missing_left, value=self.value, roots=self.roots,
+                max_depth=self.max_depth, classes=self.classes_,
+                feature_names=np.asarray([] if self.feature_names_in_ is None else self.feature_names_in_, dtype=str),
+            )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            names = data["feature_names"]
+            return cls(
+                feature=data["feature"], threshold=data["threshold"], left=data["left"],
+                right=data["right"], missing_left=data["missing_left"], value=data["value"],
+                roots=data["roots"], max_depth=data["max_depth"], classes=data["classes"],
+                feature_names=names.astype(object) if len(names) else None,
+            )
+
+
+if __name__ == "__main__":
+    import os
+    import sklearn.ensemble  # noqa: F401  (keep import cost out of the load timing)
+    from joblib import load
+
+    from data.store import read_frame
+    from model.registry import flat_path, load_metadata, model_path
+
+    parser = argparse.ArgumentParser(description="Compare the flat forest with the pickled sklearn model")
+    parser.add_argument("--model-id", default="default")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    meta = load_metadata(args.model_id)
+    pkl_path = model_path(args.model_id)
+    npz_path = flat_path(args.model_id)
+
+    start = time.perf_counter()
+    model = load(pkl_path)
+    pkl_load = time.perf_counter() - start
+    if not npz_path.exists():
+        FlatForest.from_sklearn(model).save(npz_path)
+    start = time.perf_counter()
+    flat = FlatForest.load(npz_path)
+    npz_load = time.perf_counter() - start
+
+    X = pd.concat([read_frame(t, "features") for t in meta["tickers"]])[meta["features"]]
+    row = X.tail(1)
+    max_diff = float(np.max(np.abs(model.predict_proba(X) - flat.predict_proba(X))))
+
+    def per_call(fn, data):
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            fn(data)
+        return (time.perf_counter() - start) / args.repeats
+
+    model.set_params(n_jobs=1)
+    print(f"Artifact size:   pickle {os.path.getsize(pkl_path) / 1e6:.2f} MB, "
+          f"flat {os.path.getsize(npz_path) / 1e6:.2f} MB")
+    print(f"Load time:       pickle {pkl_load * 1e3:.1f} ms, flat {npz_load * 1e3:.1f} ms")
+    print(f"Single row:      sklearn {per_call(model.predict_proba, row) * 1e3:.2f} ms, "
+          f"flat {per_call(flat.predict_proba, row) * 1e3:.2f} ms")
+    print(f"Batch ({len(X)} rows): sklearn {per_call(model.predict_proba, X) * 1e3:.2f} ms, "
+          f"flat {per_call(flat.predict_proba, X) * 1e3:.2f} ms")
+    print(f"Max |proba diff|: {max_diff:.2e}")
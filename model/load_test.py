@@ -0,0 +1,98 @@
+"""
+Load test for the local prediction server.
+Starts an in-process server on localhost for each batching window (or
+targets --url), fires concurrent requests from client threads and
+reports latency percentiles, throughput and the server's mean batch size.
+
+    python model/load_test.py --clients 32 --requests 2000 --windows 0 2 5
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.store import list_tickers, read_frame
+from data.feature_registry import BASE_MODEL_FEATURES, OPTIONAL_MODEL_FEATURES
+from model.serve import PredictionClient, make_server
+
+
+def sample_requests(tickers, n_requests, seed=0):
+    """Random (ticker, features) pairs drawn from the stored feature history."""
+    rng = np.random.default_rng(seed)
+    pools = {}
+    for ticker in tickers:
+        df = read_frame(ticker, columns=BASE_MODEL_FEATURES + OPTIONAL_MODEL_FEATURES).drop(columns="Date")
+        pools[ticker] = df.dropna().to_dict("records")
+    picks = rng.choice(list(pools), size=n_requests)
+    return [(t, pools[t][rng.integers(len(pools[t]))]) for t in picks]
+
+
+def run_load(url, work, clients):
+    """Send `work` from `clients` threads; returns (latencies in seconds, wall time, errors)."""
+    local = threading.local()
+    errors = []
+
+    def call(item):
+        if not hasattr(local, "client"):
+            local.client = PredictionClient(url)
+        start = time.perf_counter()
+        try:
+            local.client.predict(*item)
+        except Exception as e:
+            errors.append(str(e))
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(call, work))
+    return np.array(latencies), time.perf_counter() - start, errors
+
+
+def report(label, latencies, wall, errors, server_stats=None):
+    ms = latencies * 1000
+    line = (f"{label:>14}: {len(ms) / wall:8.1f} req/s | p50 {np.percentile(ms, 50):6.2f} ms | "
+            f"p95 {np.percentile(ms, 95):6.2f} ms | p99 {np.percentile(ms, 99):6.2f} ms")
+    if server_stats:
+        line += f" | mean batch {server_stats['mean_batch_size']}"
+    if errors:
+        line += f" | {len(errors)} errors ({errors[0]})"
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the prediction server on localhost")
+    parser.add_argument("--url", default=None, help="Target a running server instead of starting one")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.0, 2.0, 5.0],
+                        help="Batching windows (ms) to compare when starting in-process servers")
+    parser.add_argument("--tickers", nargs="+", default=None)
+    args = parser.parse_args()
+
+    work = sample_requests(args.tickers or list_tickers("features"), args.requests)
+    warmup = work[: min(50, len(work))]
+
+    if args.url:
+        client = PredictionClient(args.url)
+        run_load(args.url, warmup, args.clients)
+        report("remote", *run_load(args.url, work, args.clients), client.stats())
+    else:
+        for window in args.windows:
+            server = make_server(port=0, window_ms=window)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            run_load(url, warmup, args.clients)
+            before = server.batcher.stats()
+            latencies, wall, errors = run_load(url, work, args.clients)
+            after = server.batcher.stats()
+            batches = after["batches"] - before["batches"]
+            stats = {"mean_batch_size": round((after["requests"] - before["requests"]) / max(batches, 1), 2)}
+            report(f"window {window:g} ms", latencies, wall, errors, stats)
+            server.shutdown()
+            server.server_close()
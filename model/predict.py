@@ -1,17 +1,181 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 from joblib import load
-from pathlib import Path
 
-# Load model once at module level
+from model.flat_forest import FlatForest
+from model.registry import flat_path, model_path as registry_model_path, resolve_model_id
+
+# Legacy single-model artifacts, used when the registry has no model for a ticker
 model_path = Path(__file__).parent / "model.pkl"
-model = load(model_path)
- 
-def predict_trend(latest_row):
+flat_model_path = Path(__file__).parent / "model.npz"
+LEGACY_MODEL_ID = "legacy"
+
+# The flat-array walker beats sklearn on small batches, sklearn's
+# vectorized traversal wins above roughly this many rows
+FLAT_MAX_ROWS = 500
+
+
+def _artifact_path(model_id, prefer_flat=True):
+    """Artifact to load for a model id: the flat-array export or the pickle, whichever exists first."""
+    if model_id == LEGACY_MODEL_ID:
+        candidates = [flat_model_path, model_path]
+    else:
+        candidates = [flat_path(model_id), registry_model_path(model_id)]
+    if not prefer_flat:
+        candidates.reverse()
+    for path in candidates:
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No model artifact for {model_id}")
+
+
+def _load_artifact(path):
+    return FlatForest.load(path) if path.suffix == ".npz" else load(path)
+
+
+class ModelCache:
+    """
+    Lazily loaded models keyed by model id and artifact kind: batches of
+    up to FLAT_MAX_ROWS rows use the flat-array export, larger ones the
+    pickled sklearn forest (both are kept when both are used).
+    Least recently used models are evicted beyond `max_models` entries or
+    `max_bytes` of artifacts on disk. Each lookup compares the artifact's
+    mtime with the cached copy, so retrained models are picked up without
+    restarting the process.
+    """
+
+    def __init__(self, max_models=8, max_bytes=None):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (model_id, kind) -> (path, mtime_ns, size, model)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def get(self, model_id, rows=1):
+        """Model for scoring `rows` feature rows at once."""
+        path = _artifact_path(model_id, prefer_flat=rows <= FLAT_MAX_ROWS)
+        key = (model_id, "flat" if path.suffix == ".npz" else "pickle")
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == path and entry[1] == stat.st_mtime_ns:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            if entry is not None:
+                self.reloads += 1
+            else:
+                self.misses += 1
+
+        model = _load_artifact(path)
+        with self._lock:
+            self._entries[key] = (path, stat.st_mtime_ns, stat.st_size, model)
+            self._entries.move_to_end(key)
+            self._evict()
+        return model
+
+    def _evict(self):
+        def over_budget():
+            if len(self._entries) > self.max_models:
+                return True
+            if self.max_bytes is not None and len(self._entries) > 1:
+                return sum(e[2] for e in self._entries.values()) > self.max_bytes
+            return False
+
+        while over_budget():
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models": [f"{model_id}:{kind}" for model_id, kind in self._entries],
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+            }
+
+
+model_cache = ModelCache()
+
+
+def model_id_for(ticker=None):
+    """Registry model serving a ticker, or the legacy model if none is registered."""
+    if ticker is not None:
+        model_id = resolve_model_id(ticker)
+        if flat_path(model_id).exists() or registry_model_path(model_id).exists():
+            return model_id
+    return LEGACY_MODEL_ID
+
+
+def get_model(ticker=None):
+    return model_cache.get(model_id_for(ticker))
+
+
+def predict_trend(latest_row, ticker=None):
     """
     Predict stock trend from latest features.
-    Handles both old (4 features) and new (7 features) models.
+    Uses the ticker's registered model when one exists, otherwise the
+    legacy model/model.pkl. Handles both old (4 features) and new
+    (7 features) models.
     """
+    model = get_model(ticker)
+    names = getattr(model, "feature_names_in_", None)
+    if isinstance(latest_row, pd.DataFrame) and names is not None:
+        latest_row = latest_row[list(names)]
     prob = model.predict_proba(latest_row)[0][1]
     trend = "UP" if prob > 0.5 else "DOWN"
     confidence = round(prob * 100, 2) if prob > 0.5 else round((1 - prob) * 100, 2)
-    return trend, confidence
\ No newline at end of file
+    return trend, confidence
+
+
+def predict_trend_batch(features, tickers=None):
+    """
+    Score many feature rows with one predict_proba call per model.
+    `tickers` maps rows to tickers: a single ticker for every row (e.g. a
+    historical backfill), a sequence aligned with the rows (a universe
+    scan), or None for the legacy model. Rows are grouped by the model
+    serving their ticker; large groups are scored with the sklearn
+    forest rather than the flat-array export.
+    Returns a DataFrame indexed like `features` with ticker, model_id,
+    prob_up, trend and confidence columns.
+    """
+    if tickers is None or isinstance(tickers, str):
+        tickers = [tickers] * len(features)
+    tickers = list(tickers)
+    resolved = {}
+    row_models = np.array([resolved[t] if t in resolved else resolved.setdefault(t, model_id_for(t))
+                           for t in tickers], dtype=object)
+    model_codes, model_ids = pd.factorize(row_models)
+
+    prob = np.empty(len(features))
+    for code, model_id in enumerate(model_ids):
+        rows = np.flatnonzero(model_codes == code)
+        model = model_cache.get(model_id, rows=len(rows))
+        names = getattr(model, "feature_names_in_", None)
+        X = features.iloc[rows]
+        if names is not None:
+            X = X[list(names)]
+        prob[rows] = model.predict_proba(X)[:, 1]
+
+    up = prob > 0.5
+    return pd.DataFrame({
+        "ticker": tickers,
+        "model_id": row_models,
+        "prob_up": prob,
+        "trend": np.where(up, "UP", "DOWN"),
+        "confidence": np.round(np.where(up, prob, 1 - prob) * 100, 2),
+    }, index=features.index)
@@ -0,0 +1,126 @@
+"""
+On-disk model registry.
+Each trained model lives in its own directory with a metadata file:
+
+    model/registry/{model_id}/model.pkl
+    model/registry/{model_id}/forest.npz   (flat-array copy for inference)
+    model/registry/{model_id}/meta.json
+
+model_id is a ticker for per-ticker models, a group name for models
+shared by a sector group, or "default" for the pooled fallback model.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+from joblib import dump, load
+
+from model.flat_forest import FlatForest
+
+REGISTRY_ROOT = Path(__file__).parent / "registry"
+DEFAULT_MODEL_ID = "default"
+
+# ticker -> model id map, rebuilt when the registry directory's mtime changes
+_index = {"mtime_ns": None, "models": {}}
+_index_lock = threading.Lock()
+
+
+def model_dir(model_id):
+    return REGISTRY_ROOT / model_id
+
+
+def model_path(model_id):
+    return model_dir(model_id) / "model.pkl"
+
+
+def flat_path(model_id):
+    return model_dir(model_id) / "forest.npz"
+
+
+def meta_path(model_id):
+    return model_dir(model_id) / "meta.json"
+
+
+def save_model(model_id, model, metadata):
+    """Write a model artifact and its metadata, replacing any previous version."""
+    directory = model_dir(model_id)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    tmp_model = directory / "model.pkl.tmp"
+    dump(model, tmp_model)
+    os.replace(tmp_model, model_path(model_id))
+
+    tmp_flat = directory / "forest.npz.tmp"
+    FlatForest.from_sklearn(model).save(tmp_flat)
+    os.replace(tmp_flat, flat_path(model_id))
+
+    tmp_meta = directory / "meta.json.tmp"
+    with open(tmp_meta, "w") as f:
+        json.dump({"model_id": model_id, **metadata}, f, indent=2)
+    os.replace(tmp_meta, meta_path(model_id))
+    # Rewriting a model doesn't change the registry directory itself; bump it for the resolver index
+    os.utime(REGISTRY_ROOT)
+    return model_path(model_id)
+
+
+def load_model(model_id):
+    path = model_path(model_id)
+    if not path.exists():
+        raise FileNotFoundError(f"No model registered as {model_id}")
+    return load(path)
+
+
+def load_flat_model(model_id):
+    """Load the flat-array copy of a model, exporting it first if missing."""
+    path = flat_path(model_id)
+    if not path.exists():
+        FlatForest.from_sklearn(load_model(model_id)).save(path)
+    return FlatForest.load(path)
+
+
+def load_metadata(model_id):
+    path = meta_path(model_id)
+    if not path.exists():
+        raise FileNotFoundError(f"No model registered as {model_id}")
+    with open(path) as f:
+        return json.load(f)
+
+
+def list_models():
+    if not REGISTRY_ROOT.exists():
+        return []
+    return sorted(p.name for p in REGISTRY_ROOT.iterdir() if (p / "model.pkl").exists())
+
+
+def _ticker_index():
+    """{ticker: model id} for every ticker with its own or a group model."""
+    try:
+        mtime_ns = REGISTRY_ROOT.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    with _index_lock:
+        if _index["mtime_ns"] == mtime_ns:
+            return _index["models"]
+
+    models = list_models()
+    index = {}
+    for model_id in models:
+        if model_id == DEFAULT_MODEL_ID:
+            continue
+        for ticker in load_metadata(model_id).get("tickers", []):
+            index.setdefault(ticker, model_id)
+    # A ticker's own model wins over any group listing it
+    index.update({model_id: model_id for model_id in models if model_id != DEFAULT_MODEL_ID})
+    with _index_lock:
+        _index.update(mtime_ns=mtime_ns, models=index)
+    return index
+
+
+def resolve_model_id(ticker):
+    """
+    Model id serving a ticker: its own model, else the group model that
+    lists it in its metadata, else the pooled default. Metadata is read
+    once per registry change, not per lookup.
+    """
+    return _ticker_index().get(ticker, DEFAULT_MODEL_ID) if ticker else DEFAULT_MODEL_ID
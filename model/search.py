@@ -0,0 +1,212 @@
+"""
+Hyperparameter search for the trend forest.
+Candidates (forest size, depth, min_samples_leaf, feature subset) are
+scored with time-series cross-validation by successive halving: every
+round evaluates the surviving candidates on a larger, most recent slice
+of the training history and keeps the best 1/factor of them. Rounds run
+across a process pool. Finalists are refitted on the full training split
+and reported with holdout accuracy, artifact size and per-row latency,
+so a fast model can be picked over a marginally more accurate one.
+
+Usage: python model/search.py [--tickers AAPL MSFT ...] [--output best_params.json]
+       python model/train_model.py --params best_params.json
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import dump
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import TimeSeriesSplit, train_test_split
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.store import read_frame, universe
+from data.feature_registry import BASE_MODEL_FEATURES, select_features
+from model.flat_forest import FlatForest
+
+SEARCH_SPACE = {
+    "n_estimators": [25, 50, 100, 200],
+    "max_depth": [4, 6, 8, 12, None],
+    "min_samples_leaf": [1, 5, 20, 50],
+}
+
+
+def feature_subsets(available):
+    """Base features, then each optional indicator family added in turn."""
+    full = select_features(available)
+    subsets = [BASE_MODEL_FEATURES]
+    if "RSI" in full:
+        subsets.append(BASE_MODEL_FEATURES + ["RSI"])
+    if len(full) > len(subsets[-1]):
+        subsets.append(full)
+    return subsets
+
+
+def load_search_data(group, test_size=0.2):
+    """
+    Chronological train/holdout split per ticker, with the pooled training
+    rows ordered by date so time-series CV folds never train on the future.
+    """
+    frames = [read_frame(ticker, "features") for ticker in group]
+    common = set.intersection(*(set(df.columns) for df in frames))
+    train_parts, test_parts = [], []
+    for df in frames:
+        train, test = train_test_split(df, test_size=test_size, shuffle=False)
+        train_parts.append(train)
+        test_parts.append(test)
+    train = pd.concat(train_parts).sort_values("Date", kind="stable").reset_index(drop=True)
+    test = pd.concat(test_parts, ignore_index=True)
+    return train, test, feature_subsets(common)
+
+
+def candidate_grid(subsets, space=SEARCH_SPACE):
+    keys = list(space)
+    return [
+        {**dict(zip(keys, values)), "features": features}
+        for values in itertools.product(*(space[k] for k in keys))
+        for features in subsets
+    ]
+
+
+def _forest(candidate, n_jobs=1):
+    params = {k: v for k, v in candidate.items() if k not in ("features", "cv_accuracy")}
+    return RandomForestClassifier(random_state=42, n_jobs=n_jobs, **params)
+
+
+# Training rows shipped to each pool worker once, by _init_worker
+_worker_train = None
+
+
+def _init_worker(train):
+    global _worker_train
+    _worker_train = train
+
+
+def cv_score(candidate, n_rows, n_splits, train=None):
+    """
+    Mean time-series CV accuracy on the most recent `n_rows` training rows.
+    In a pool worker `train` defaults to the frame passed to _init_worker.
+    """
+    data = (_worker_train if train is None else train).tail(n_rows)
+    X, y = data[candidate["features"]], data["Target"]
+    scores = []
+    for fit_idx, val_idx in TimeSeriesSplit(n_splits=n_splits).split(X):
+        model = _forest(candidate).fit(X.iloc[fit_idx], y.iloc[fit_idx])
+        scores.append(model.score(X.iloc[val_idx], y.iloc[val_idx]))
+    return float(np.mean(scores))
+
+
+def successive_halving(candidates, train, factor=3, n_splits=4, min_rows=None, max_workers=None):
+    """
+    Keep the best 1/factor of the candidates each round while multiplying
+    the rows they are scored on by `factor`. The last round scores the
+    remaining candidates on the full training history. The training rows
+    (only the columns some candidate uses) are sent to each worker once
+    when the pool starts, not with every task. Returns (survivors,
+    history), survivors ranked by their last CV accuracy.
+    """
+    n_total = len(train)
+    n_rounds = max(1, int(np.ceil(np.log(len(candidates)) / np.log(factor))))
+    n_rows = min_rows or max(n_total // factor ** (n_rounds - 1), (n_splits + 1) * 20)
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(candidates)))
+    columns = list(dict.fromkeys(f for c in candidates for f in c["features"])) + ["Target"]
+
+    history = []
+    survivors = candidates
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(train[columns],)) as pool:
+        while True:
+            final = n_rows >= n_total or len(survivors) <= factor
+            n_rows = n_total if final else n_rows
+            scores = list(pool.map(cv_score, survivors, itertools.repeat(n_rows), itertools.repeat(n_splits)))
+            history.append({"round": len(history), "candidates": len(survivors), "rows": n_rows})
+            ranked = sorted(zip(scores, range(len(survivors))), key=lambda s: -s[0])
+            keep = len(survivors) if final else max(1, len(survivors) // factor)
+            survivors = [{**survivors[i], "cv_accuracy": round(score, 4)} for score, i in ranked[:keep]]
+            if final:
+                return survivors, history
+            n_rows *= factor
+
+
+def per_row_latency(forest, X, repeats=200):
+    row = X.tail(1)
+    forest.predict_proba(row)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        forest.predict_proba(row)
+    return (time.perf_counter() - start) / repeats
+
+
+def evaluate_finalist(candidate, train, test, n_jobs=1):
+    """Refit on the full training split; holdout accuracy, artifact sizes and flat per-row latency."""
+    features = candidate["features"]
+    model = _forest(candidate, n_jobs=n_jobs).fit(train[features], train["Target"])
+    forest = FlatForest.from_sklearn(model)
+
+    pickled = io.BytesIO()
+    dump(model, pickled)
+    flat_bytes = sum(getattr(forest, name).nbytes for name in
+                     ("feature", "threshold", "left", "right", "missing_left", "value", "roots"))
+    return {
+        **candidate,
+        "holdout_accuracy": round(model.score(test[features], test["Target"]), 4),
+        "nodes": int(len(forest.feature)),
+        "pickle_mb": round(len(pickled.getvalue()) / 1e6, 3),
+        "flat_mb": round(flat_bytes / 1e6, 3),
+        "latency_ms": round(per_row_latency(forest, test[features]) * 1e3, 3),
+    }
+
+
+def run_search(group, factor=3, n_splits=4, max_workers=None, finalists=5, space=SEARCH_SPACE):
+    train, test, subsets = load_search_data(group)
+    survivors, history = successive_halving(candidate_grid(subsets, space), train, factor=factor,
+                                            n_splits=n_splits, max_workers=max_workers)
+    results = [evaluate_finalist(c, train, test, n_jobs=max_workers or -1) for c in survivors[:finalists]]
+    return results, history
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Successive-halving search over forest hyperparameters")
+    parser.add_argument("--tickers", nargs="+", default=None, help="Default: every ticker with features")
+    parser.add_argument("--factor", type=int, default=3, help="Keep 1/factor of the candidates per round")
+    parser.add_argument("--splits", type=int, default=4, help="Time-series CV folds")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--finalists", type=int, default=5)
+    parser.add_argument("--output", default=None,
+                        help="Write the chosen parameters as JSON for train_model.py --params")
+    parser.add_argument("--max-latency-ms", type=float, default=None,
+                        help="Choose the most accurate finalist under this per-row latency")
+    args = parser.parse_args()
+    args.tickers = args.tickers or universe("features")
+
+    start = time.perf_counter()
+    results, history = run_search(args.tickers, factor=args.factor, n_splits=args.splits,
+                                  max_workers=args.workers, finalists=args.finalists)
+    for step in history:
+        print(f"Round {step['round']}: {step['candidates']} candidates on {step['rows']} rows")
+    print(f"Search finished in {time.perf_counter() - start:.1f}s\n")
+
+    table = pd.DataFrame(results)
+    table["features"] = table["features"].map(len)
+    pd.set_option("display.width", 160)
+    print(table.rename(columns={"features": "n_features"}).to_string(index=False))
+
+    eligible = [r for r in results if args.max_latency_ms is None or r["latency_ms"] <= args.max_latency_ms]
+    if not eligible:
+        print(f"\n❌ No finalist under {args.max_latency_ms} ms per row")
+    else:
+        best = max(eligible, key=lambda r: r["holdout_accuracy"])
+        params = {k: best[k] for k in ("n_estimators", "max_depth", "min_samples_leaf", "features")}
+        print(f"\n✅ Chosen: {params}")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(params, f, indent=2)
+            print(f"✅ Parameters saved to {args.output}")
@@ -0,0 +1,306 @@
+"""
+Local prediction server.
+One process holds the models (through predict.py's model cache) and
+serves predictions over HTTP, so Streamlit workers and batch jobs do not
+each load their own copy. Concurrent requests are collected into
+micro-batches for a few milliseconds and scored with one
+predict_trend_batch call.
+
+    python model/serve.py --port 8765 --window-ms 5
+
+    POST /predict  {"ticker": "AAPL", "features": {"MA20": ..., ...}}
+                   or a list of such objects; without "features" the
+                   ticker's latest stored row is scored
+    GET  /stats    request/batch counters and latency percentiles
+    GET  /health
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.store import read_frame
+from data.feature_registry import BASE_MODEL_FEATURES, OPTIONAL_MODEL_FEATURES
+from model.predict import model_cache, model_id_for, predict_trend_batch
+
+DEFAULT_PORT = 8765
+
+
+def parse_request(item):
+    """
+    Validate one /predict item and return (ticker, features).
+    Raises ValueError naming the problem: not an object, missing or
+    non-string ticker, or features that are not an object of numbers
+    covering the columns of the model serving the ticker.
+    """
+    if not isinstance(item, dict):
+        raise ValueError(f"Each request must be a JSON object, got {type(item).__name__}")
+    ticker = item.get("ticker")
+    if not isinstance(ticker, str) or not ticker:
+        raise ValueError('Missing field "ticker"')
+    features = item.get("features")
+    if features is None:
+        return ticker, None
+    if not isinstance(features, dict):
+        raise ValueError('"features" must be an object of feature name to value')
+    bad = [k for k, v in features.items() if isinstance(v, bool) or not isinstance(v, (int, float))]
+    if bad:
+        raise ValueError(f"Non-numeric feature values: {bad}")
+    model_id = model_id_for(ticker)
+    names = getattr(model_cache.get(model_id), "feature_names_in_", None)
+    missing = [name for name in (names if names is not None else []) if name not in features]
+    if missing:
+        raise ValueError(f"Missing features {missing} for model {model_id}")
+    return ticker, features
+
+
+class _Pending:
+    __slots__ = ("ticker", "features", "done", "result", "error", "start")
+
+    def __init__(self, ticker, features):
+        self.ticker = ticker
+        self.features = features
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.start = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Collects requests from many threads and scores them together.
+    A batch closes `window_ms` after its first request arrives or once it
+    holds `max_batch` requests, whichever comes first.
+    """
+
+    def __init__(self, window_ms=5.0, max_batch=256, latency_window=10000):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.started = time.time()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, ticker, features=None, timeout=30):
+        """Score one request; blocks until its batch has been scored."""
+        return self.submit_many([(ticker, features)], timeout)[0]
+
+    def submit_many(self, items, timeout=30):
+        """Queue several (ticker, features) requests together and wait for all of them."""
+        pendings = [_Pending(ticker, features) for ticker, features in items]
+        for pending in pendings:
+            self._queue.put(pending)
+        deadline = time.perf_counter() + timeout
+        for pending in pendings:
+            if not pending.done.wait(max(0.0, deadline - time.perf_counter())):
+                raise TimeoutError(f"Prediction for {pending.ticker} timed out")
+            if pending.error is not None:
+                raise pending.error
+        return [pending.result for pending in pendings]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Window closed: still take whatever is already queued
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self._score(batch)
+            except Exception:
+                # Isolate the bad request instead of failing the whole batch
+                results = [self._score_one(pending) for pending in batch]
+
+            now = time.perf_counter()
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch)
+                for pending, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        pending.error = result
+                        self.errors += 1
+                    else:
+                        pending.result = result
+                    self._latencies.append(now - pending.start)
+            for pending in batch:
+                pending.done.set()
+
+    @staticmethod
+    def _score(batch):
+        rows, tickers, results = [], [], [None] * len(batch)
+        for i, pending in enumerate(batch):
+            try:
+                if pending.features is None:
+                    latest = read_frame(pending.ticker, columns=BASE_MODEL_FEATURES + OPTIONAL_MODEL_FEATURES)
+                    rows.append((i, latest.iloc[-1].drop("Date").to_dict()))
+                else:
+                    rows.append((i, pending.features))
+                tickers.append(pending.ticker)
+            except Exception as e:
+                results[i] = e
+        if not rows:
+            return results
+
+        positions = [i for i, _ in rows]
+        features = pd.DataFrame([f for _, f in rows], index=positions)
+        scores = predict_trend_batch(features, tickers)
+        for i, score in zip(positions, scores.to_dict("records")):
+            results[i] = {
+                "ticker": score["ticker"],
+                "trend": score["trend"],
+                "confidence": float(score["confidence"]),
+                "prob_up": float(score["prob_up"]),
+                "model_id": score["model_id"],
+            }
+        return results
+
+    @classmethod
+    def _score_one(cls, pending):
+        try:
+            return cls._score([pending])[0]
+        except Exception as e:
+            return e
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            elapsed = time.time() - self.started
+            stats = {
+                "requests": self.requests,
+                "batches": self.batches,
+                "errors": self.errors,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "throughput_rps": round(self.requests / elapsed, 1) if elapsed else 0.0,
+                "window_ms": self.window * 1000,
+            }
+        for p in (50, 95, 99):
+            stats[f"latency_p{p}_ms"] = round(float(np.percentile(latencies, p)), 3) if len(latencies) else None
+        stats["model_cache"] = model_cache.stats()
+        return stats
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(200, self.server.batcher.stats())
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+
+        items = payload if isinstance(payload, list) else [payload]
+        try:
+            if not items:
+                raise ValueError("Empty request list")
+            parsed = [parse_request(item) for item in items]
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except FileNotFoundError as e:
+            self._send_json(404, {"error": str(e)})
+            return
+
+        try:
+            results = self.server.batcher.submit_many(parsed)
+        except FileNotFoundError as e:
+            self._send_json(404, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, results if isinstance(payload, list) else results[0])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, window_ms=5.0, max_batch=256):
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    server.daemon_threads = True
+    server.batcher = MicroBatcher(window_ms=window_ms, max_batch=max_batch)
+    return server
+
+
+class PredictionClient:
+    """Thin client for the prediction server, reusing one HTTP connection."""
+
+    def __init__(self, url=f"http://127.0.0.1:{DEFAULT_PORT}", timeout=10):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def predict(self, ticker, features=None):
+        payload = {"ticker": ticker}
+        if features is not None:
+            payload["features"] = features
+        response = self.session.post(f"{self.url}/predict", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self):
+        response = self.session.get(f"{self.url}/stats", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve trend predictions over local HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--window-ms", type=float, default=5.0, help="Micro-batch collection window")
+    parser.add_argument("--max-batch", type=int, default=256)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.window_ms, args.max_batch)
+    print(f"✅ Serving predictions on http://{args.host}:{args.port} (window {args.window_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
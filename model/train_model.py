@@ -1,36 +1,247 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from joblib import dump
-
-tickers = ["AAPL", "MSFT", "TSLA", "GOOGL", "AMZN", "GE"]
-for ticker in tickers:
- df = pd.read_csv(f"data/{ticker}_features.csv")
-
-# Base features
-feature_cols = ["MA20", "MA50", "Return", "Volume"]
-
-# Add RSI and MACD if they exist
-if "RSI" in df.columns:
-    feature_cols.append("RSI")
-if "MACD" in df.columns:
-    feature_cols.append("MACD")
-if "MACD_Hist" in df.columns:
-    feature_cols.append("MACD_Hist")
-
-X = df[feature_cols]
-y = df["Target"]
- 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, shuffle=False
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data.store import read_frame, universe
+from data.feature_registry import feature_version, select_features
+from model.registry import (
+    DEFAULT_MODEL_ID, flat_path, list_models, load_metadata, load_model, model_path, save_model
 )
- 
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-accuracy = model.score(X_test, y_test)
-print(f"✅ Model trained with features: {feature_cols}")
-print(f"✅ Test accuracy: {accuracy:.2%}")
- 
-dump(model, "model/model.pkl")
-print("✅ Model saved to model/model.pkl")
+
+
+def load_split(group, test_size=0.2, recent_bars=None):
+    """
+    Load features for a group of tickers and split each one chronologically.
+    With `recent_bars`, only the last that many training bars per ticker
+    are kept; the test split is unchanged.
+    Returns (X_train, X_test, y_train, y_test, feature_cols, train_range).
+    """
+    frames = {ticker: read_frame(ticker, "features") for ticker in group}
+
+    # Base features plus RSI/MACD when every ticker in the group has them
+    common = set.intersection(*(set(df.columns) for df in frames.values()))
+    feature_cols = select_features(common)
+
+    train_parts, test_parts = [], []
+    for df in frames.values():
+        train, test = train_test_split(df, test_size=test_size, shuffle=False)
+        if recent_bars is not None:
+            train = train.tail(recent_bars)
+        train_parts.append(train)
+        test_parts.append(test)
+    train = pd.concat(train_parts)
+    test = pd.concat(test_parts)
+
+    train_range = (str(train["Date"].min().date()), str(train["Date"].max().date()))
+    return (train[feature_cols], test[feature_cols], train["Target"], test["Target"],
+            feature_cols, train_range)
+
+
+def fit_model(model_id, group, n_jobs=1, n_estimators=100, save=True, params=None):
+    """
+    Fit one forest on a group of tickers and save it to the registry.
+    `params` overrides forest parameters (e.g. from model/search.py); its
+    optional "features" entry restricts the feature columns.
+    """
+    X_train, X_test, y_train, y_test, feature_cols, train_range = load_split(group)
+    params = dict(params or {})
+    if "features" in params:
+        feature_cols = [c for c in params.pop("features") if c in feature_cols]
+        X_train, X_test = X_train[feature_cols], X_test[feature_cols]
+    params.setdefault("n_estimators", n_estimators)
+
+    model = RandomForestClassifier(random_state=42, n_jobs=n_jobs, **params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    metadata = {
+        "tickers": list(group),
+        "features": feature_cols,
+        "feature_version": feature_version(feature_cols),
+        "train_start": train_range[0],
+        "train_end": train_range[1],
+        "n_train": len(X_train),
+        "n_test": len(X_test),
+        "accuracy": model.score(X_test, y_test),
+        "fit_seconds": round(fit_seconds, 3),
+        "n_estimators": params["n_estimators"],
+        "params": params,
+        "trained_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+    }
+    if save:
+        save_model(model_id, model, metadata)
+    return metadata
+
+
+def load_recent(group, recent_bars):
+    """
+    Load the newest `recent_bars` labelled feature rows of each ticker in
+    a group. The last bar is left out: its Target (next-bar direction) is
+    not known yet. Returns (X, y, feature_cols, date_range).
+    """
+    frames = {ticker: read_frame(ticker, "features") for ticker in group}
+
+    common = set.intersection(*(set(df.columns) for df in frames.values()))
+    feature_cols = select_features(common)
+
+    recent = pd.concat(df.iloc[:-1].tail(recent_bars) for df in frames.values())
+    date_range = (str(recent["Date"].min().date()), str(recent["Date"].max().date()))
+    return recent[feature_cols], recent["Target"], feature_cols, date_range
+
+
+def retrain_incremental(model_id, recent_bars=250, new_trees=20, max_trees=None, n_jobs=1, save=True,
+                        holdout=False):
+    """
+    Refresh a registered forest without a full refit.
+    Adds `new_trees` trees (via warm_start) fitted on the newest
+    `recent_bars` bars of each ticker, then retires the oldest trees so at
+    most `max_trees` remain (default: the forest's size before the refresh).
+    With `holdout`, the new trees are fitted on the last `recent_bars` bars
+    of the chronological train split instead and scored on the test split,
+    as model/benchmark_retrain.py does. Returns (model, metadata).
+    """
+    model = load_model(model_id)
+    metadata = load_metadata(model_id)
+    if holdout:
+        X_train, X_test, y_train, y_test, feature_cols, train_range = load_split(
+            metadata["tickers"], recent_bars=recent_bars
+        )
+    else:
+        X_train, y_train, feature_cols, train_range = load_recent(metadata["tickers"], recent_bars)
+    if not set(metadata["features"]) <= set(feature_cols):
+        raise ValueError(f"{model_id} was trained on {metadata['features']}, data now has {feature_cols}; "
+                         "run a full refit")
+    X_train = X_train[metadata["features"]]
+    if max_trees is None:
+        max_trees = len(model.estimators_)
+
+    # warm_start seeds new trees after skipping len(estimators_) draws, so a forest trimmed back
+    # to the same size would repeat the last refresh's seeds; draw from a fresh seed every refresh
+    refreshes = metadata.get("refreshes", 0) + 1
+    saved_n_jobs = model.n_jobs
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees, n_jobs=n_jobs,
+                     random_state=42 + refreshes)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    if len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+    # Don't persist this run's core count with the model
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_), n_jobs=saved_n_jobs)
+
+    # train_start/n_train keep describing the original fit; the refresh window is recorded separately.
+    # Without a holdout the newest bars are in the original test split, so accuracy is not re-scored.
+    metadata.update({
+        "train_end": train_range[1],
+        "fit_seconds": round(fit_seconds, 3),
+        "n_estimators": len(model.estimators_),
+        "params": {**metadata.get("params", {}), "n_estimators": len(model.estimators_)},
+        "refreshes": refreshes,
+        "retrain_window": recent_bars,
+        "retrain_holdout": holdout,
+        "retrain_start": train_range[0],
+        "retrain_rows": len(X_train),
+        "retrained_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+    })
+    if holdout:
+        X_test = X_test[metadata["features"]]
+        metadata.update({"n_test": len(X_test), "accuracy": model.score(X_test, y_test)})
+    if save:
+        save_model(model_id, model, metadata)
+    return model, metadata
+
+
+def train_all(groups, core_budget=None, max_workers=None, params=None):
+    """
+    Fit one model per group across a process pool.
+    `core_budget` caps the total cores used: it is split between pool
+    workers and each forest's n_jobs so the two levels of parallelism do
+    not oversubscribe the machine.
+    Returns (results, failures): {model_id: metadata} and {model_id: reason}.
+    """
+    core_budget = core_budget or os.cpu_count() or 1
+    workers = max(1, min(max_workers or core_budget, len(groups), core_budget))
+    rf_jobs = max(1, core_budget // workers)
+
+    results, failures = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fit_model, model_id, group, rf_jobs, params=params): model_id
+            for model_id, group in groups.items()
+        }
+        for future in as_completed(futures):
+            model_id = futures[future]
+            try:
+                results[model_id] = future.result()
+            except Exception as e:
+                failures[model_id] = str(e)
+    return results, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train trend models into the model registry")
+    parser.add_argument("--groups", help="JSON file mapping group name to a list of tickers "
+                                         "(default: one model per ticker)")
+    parser.add_argument("--cores", type=int, default=None, help="Total core budget (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="Maximum concurrent fits")
+    parser.add_argument("--params", help="JSON file of forest parameters chosen by model/search.py")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Refresh the registered forests with trees fitted on the newest bars instead of refitting")
+    parser.add_argument("--recent-bars", type=int, default=250, help="Training window for --incremental")
+    parser.add_argument("--new-trees", type=int, default=20, help="Trees added per --incremental run")
+    parser.add_argument("--max-trees", type=int, default=None,
+                        help="Retire the oldest trees beyond this count (default: keep each forest's current size)")
+    args = parser.parse_args()
+
+    if args.incremental:
+        for model_id in list_models():
+            try:
+                _, meta = retrain_incremental(model_id, recent_bars=args.recent_bars, new_trees=args.new_trees,
+                                              max_trees=args.max_trees, n_jobs=args.cores or -1)
+            except Exception as e:
+                print(f"❌ {model_id} failed: {e}")
+                continue
+            print(f"✅ {model_id}: {meta['n_estimators']} trees on bars from {meta['retrain_start']} "
+                  f"to {meta['train_end']}, fit {meta['fit_seconds']}s")
+        refreshed_default = DEFAULT_MODEL_ID in list_models()
+    else:
+        if args.groups:
+            with open(args.groups) as f:
+                groups = json.load(f)
+        else:
+            groups = {ticker: [ticker] for ticker in universe("features")}
+        # Pooled fallback for tickers without their own model
+        groups[DEFAULT_MODEL_ID] = sorted({t for group in groups.values() for t in group})
+
+        params = None
+        if args.params:
+            with open(args.params) as f:
+                params = json.load(f)
+        results, failures = train_all(groups, core_budget=args.cores, max_workers=args.workers, params=params)
+        for model_id in groups:
+            if model_id in failures:
+                print(f"❌ {model_id} failed: {failures[model_id]}")
+                continue
+            meta = results[model_id]
+            print(f"✅ {model_id}: accuracy {meta['accuracy']:.2%}, fit {meta['fit_seconds']}s, "
+                  f"features {meta['features']}")
+        refreshed_default = DEFAULT_MODEL_ID in results
+
+    if refreshed_default:
+        # predict.py still serves model/model.pkl (or its flat copy model/model.npz)
+        shutil.copyfile(model_path(DEFAULT_MODEL_ID), "model/model.pkl")
+        shutil.copyfile(flat_path(DEFAULT_MODEL_ID), "model/model.npz")
+        print("✅ Default model saved to model/model.pkl and model/model.npz")
@@ -0,0 +1,100 @@
+"""
+Benchmark Finnhub calls with a fresh connection per request (the old
+requests.get behaviour) against the shared pooled session.
+Runs a local stub of the two endpoints the agents use. --handshake-ms
+delays every new connection to stand in for the TCP/TLS handshake and
+round trip to the real API, which a local plain-HTTP server doesn't have.
+
+Usage: python services/benchmark_finnhub.py [--calls 200] [--threads 4] [--handshake-ms 30]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ.setdefault("FINNHUB_API_KEY", "stub")
+
+from services.finnhub_client import FinnhubClient, make_session
+
+NEWS = [{"headline": f"Stub headline {i}", "source": "stub", "datetime": 1700000000 + i,
+         "url": "", "summary": ""} for i in range(20)]
+EARNINGS = {"earningsCalendar": [{"symbol": "AAPL", "date": "2024-01-25", "epsEstimate": 2.1, "epsActual": None}]}
+
+
+def make_stub_server(handshake_ms):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            time.sleep(handshake_ms / 1000)
+            super().setup()
+
+        def do_GET(self):
+            body = json.dumps(EARNINGS if self.path.startswith("/calendar/earnings") else NEWS).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_calls(client, calls, threads):
+    """(wall seconds, per-call latencies) for alternating news/earnings calls."""
+    def one(i):
+        start = time.perf_counter()
+        if i % 2:
+            client.get_earnings_calendar("AAPL")
+        else:
+            client.get_company_news("AAPL")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(one, range(calls)))
+    return time.perf_counter() - start, latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs per-call Finnhub connections")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--pool-size", type=int, default=10)
+    args = parser.parse_args()
+
+    server = make_stub_server(args.handshake_ms)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    clients = {
+        # The requests module has the same get() as a Session, without pooling
+        "per-call": FinnhubClient(session=requests, base_url=base_url),
+        "pooled": FinnhubClient(session=make_session(args.pool_size), base_url=base_url),
+    }
+
+    print(f"{args.calls} calls, {args.threads} threads, {args.handshake_ms:.0f} ms per new connection")
+    for label, client in clients.items():
+        run_calls(client, args.threads, args.threads)  # warm-up
+        wall, latencies = run_calls(client, args.calls, args.threads)
+        latencies_ms = sorted(l * 1e3 for l in latencies)
+        print(f"  {label:<9} {args.calls / wall:8.1f} calls/s   "
+              f"p50 {statistics.median(latencies_ms):7.2f} ms   "
+              f"p95 {latencies_ms[int(0.95 * (len(latencies_ms) - 1))]:7.2f} ms")
+    server.shutdown()
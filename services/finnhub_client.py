@@ -1,9 +1,15 @@
 """
 Finnhub API client with retry logic and error handling.
 Provides company news and earnings calendar data.
+Requests go through one process-wide keep-alive session, so repeated
+calls reuse pooled connections instead of a new TCP/TLS handshake each.
+Pool size and timeouts come from FINNHUB_POOL_SIZE, FINNHUB_CONNECT_TIMEOUT
+and FINNHUB_READ_TIMEOUT; use get_client() for the shared client.
 """
 import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
@@ -11,13 +17,50 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 
 load_dotenv()
 
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+
+_session = None
+_client = None
+_lock = threading.Lock()
+
+
+def make_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Keep-alive session holding up to `pool_size` connections per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled session, sized from FINNHUB_POOL_SIZE."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = make_session(int(os.getenv("FINNHUB_POOL_SIZE", DEFAULT_POOL_SIZE)))
+        return _session
+
+
+def default_timeout() -> tuple:
+    return (
+        float(os.getenv("FINNHUB_CONNECT_TIMEOUT", DEFAULT_TIMEOUT[0])),
+        float(os.getenv("FINNHUB_READ_TIMEOUT", DEFAULT_TIMEOUT[1])),
+    )
+
+
 class FinnhubClient:
     BASE_URL = "https://finnhub.io/api/v1"
     
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None, timeout: Optional[tuple] = None,
+                 base_url: Optional[str] = None):
         self.api_key = os.getenv("FINNHUB_API_KEY")
         if not self.api_key:
             print("⚠️ FINNHUB_API_KEY not found in .env")
+        self.session = session or get_session()
+        self.timeout = timeout or default_timeout()
+        self.base_url = base_url or self.BASE_URL
     
     @retry(
         stop=stop_after_attempt(3),
@@ -31,7 +74,7 @@ class FinnhubClient:
         
         params["token"] = self.api_key
         try:
-            response = requests.get(f"{self.BASE_URL}/{endpoint}", params=params, timeout=10)
+            response = self.session.get(f"{self.base_url}/{endpoint}", params=params, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
@@ -109,3 +152,14 @@ class FinnhubClient:
                 }
         
         return None
+
+
+def get_client() -> FinnhubClient:
+    """Process-wide client shared by the agents and chatbot tools."""
+    global _client
+    if _client is None:
+        client = FinnhubClient()
+        with _lock:
+            if _client is None:
+                _client = client
+    return _client
@@ -2,12 +2,211 @@
 Realized Volatility Analyzer
 Calculates and visualizes 30/60/90 day rolling realized volatility trends.
 """
+import io
+
 import numpy as np
 import pandas as pd
-import yfinance as yf
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Tuple
+
+RV_WINDOWS = (30, 60, 90)
+ANNUALIZATION = np.sqrt(252) * 100
+
+
+def _window_sums(cumulative: np.ndarray, window: int) -> np.ndarray:
+    """Trailing `window`-row sums from a cumulative sum with a leading zero row."""
+    sums = np.full((cumulative.shape[0] - 1, cumulative.shape[1]), np.nan)
+    sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def realized_volatility_panel(closes: pd.DataFrame, windows: Iterable[int] = RV_WINDOWS) -> pd.DataFrame:
+    """
+    Rolling realized volatility for a whole universe in one pass.
+    `closes` is a date x ticker matrix of closing prices. Each ticker's
+    bars are packed to the top of its column first, so windows span its
+    own last N bars (as in the per-ticker calculation) and a bar missing
+    from the union calendar doesn't blank the following window. Every
+    window is computed from cumulative sums of log returns and squared log
+    returns, so the cost does not grow with the window length. Values
+    match `log_returns.rolling(w).std() * sqrt(252) * 100` on each
+    ticker's own bars.
+    Returns a frame with (field, ticker) columns: RV{w}, plus the
+    cross-sectional RV{w}_rank (1 = lowest) and RV{w}_pct (0-100) per date.
+    """
+    from data.panel_features import pack_columns, unpack_columns
+
+    close = closes.to_numpy(dtype=np.float64)
+    packed, order, _ = pack_columns(close, ~np.isnan(close))
+    log_returns = np.full(packed.shape, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_returns[1:] = np.log(packed[1:] / packed[:-1])
+    valid = ~np.isnan(log_returns)
+    # Demeaning leaves the variance unchanged and keeps the cumulative sums small
+    centered = np.where(valid, log_returns - np.nanmean(log_returns, axis=0), 0.0)
+
+    zero = np.zeros((1, closes.shape[1]))
+    count = np.vstack([zero, np.cumsum(valid, axis=0)])
+    total = np.vstack([zero, np.cumsum(centered, axis=0)])
+    total_sq = np.vstack([zero, np.cumsum(centered ** 2, axis=0)])
+
+    fields = {}
+    for window in windows:
+        n = _window_sums(count, window)
+        s1 = _window_sums(total, window)
+        s2 = _window_sums(total_sq, window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = np.maximum(s2 - s1 ** 2 / n, 0.0) / (n - 1)
+        # Like rolling(), require a full window of returns
+        variance[n < window] = np.nan
+        rv = np.sqrt(variance) * ANNUALIZATION
+        rv = pd.DataFrame(unpack_columns(rv, order), index=closes.index, columns=closes.columns)
+        rank = rv.rank(axis=1)
+        fields[f"RV{window}"] = rv
+        fields[f"RV{window}_rank"] = rank
+        fields[f"RV{window}_pct"] = rank.div(rv.notna().sum(axis=1), axis=0) * 100
+
+    return pd.concat(fields, axis=1)
+
+
+def screen_volatility_regimes(panel: pd.DataFrame, windows: Tuple[int, int, int] = RV_WINDOWS) -> pd.DataFrame:
+    """
+    Latest volatility regime for every ticker in a `realized_volatility_panel`.
+    Same rules as `analyze_volatility_trends`: expansion when short > medium
+    > long window RV, compression when short < medium < long. A ticker
+    without a bar on the last date keeps its latest values; `as_of` is the
+    date they are from.
+    """
+    short, medium, long = (f"RV{w}" for w in windows)
+    latest = panel.ffill().iloc[-1].unstack(0)
+    as_of = panel[short].apply(lambda column: column.last_valid_index())
+    regime = np.select(
+        [(latest[short] > latest[medium]) & (latest[medium] > latest[long]),
+         (latest[short] < latest[medium]) & (latest[medium] < latest[long])],
+        ["expansion", "compression"],
+        default="mixed",
+    )
+    screen = latest[[short, medium, long, f"{short}_pct"]].assign(
+        spread=latest[short] - latest[long],
+        regime=regime,
+        as_of=as_of,
+    )
+    return screen.sort_values(f"{short}_pct", ascending=False)
+
+
+def rolling_percentile_rank(values: pd.Series, window: int = None) -> pd.Series:
+    """
+    Percentile (0-100) of each value among the trailing `window` values,
+    itself included: the share of them strictly below it, as in
+    `analyze_volatility_trends`. window=None uses all prior values.
+    Values are ranked once with np.searchsorted, and a Fenwick tree over
+    those ranks counts the values currently in the window, so each step
+    is an O(log n) update and prefix count: O(n log n) for the series
+    instead of rescanning the window. NaNs are skipped and give NaN.
+    """
+    vals = values.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(vals)
+    ranks = (np.searchsorted(np.unique(vals[valid]), vals) + 1).tolist()
+    valid = valid.tolist()
+    size = len(ranks)
+    tree = [0] * (size + 1)
+    out = np.full(size, np.nan)
+    count = 0
+    for pos in range(size):
+        if window is not None and pos >= window and valid[pos - window]:
+            i = ranks[pos - window]
+            while i <= size:
+                tree[i] -= 1
+                i += i & -i
+            count -= 1
+        if not valid[pos]:
+            continue
+        i = ranks[pos]
+        while i <= size:
+            tree[i] += 1
+            i += i & -i
+        count += 1
+        # Values with a lower rank are the ones strictly below this one
+        below, i = 0, ranks[pos] - 1
+        while i > 0:
+            below += tree[i]
+            i -= i & -i
+        out[pos] = below / count * 100
+    return pd.Series(out, index=values.index, name=values.name)
+
+
+def realized_volatility(close: pd.Series, windows: Iterable[int] = RV_WINDOWS) -> pd.DataFrame:
+    """RV{w} columns (annualized %, rolling std of log returns) for a close series."""
+    log_returns = np.log(close / close.shift(1))
+    return pd.DataFrame({f'RV{w}': log_returns.rolling(window=w).std() * ANNUALIZATION for w in windows})
+
+
+def volatility_regime_history(rv: pd.DataFrame, window: int = 252,
+                              windows: Tuple[int, int, int] = RV_WINDOWS) -> pd.DataFrame:
+    """
+    Per-date volatility regime for an RV frame (RV30/RV60/RV90 columns):
+    RV{w}_pct, each window's rolling percentile rank over the trailing
+    `window` days, and the expansion/compression/mixed regime.
+    """
+    short, medium, long = (f"RV{w}" for w in windows)
+    history = rv[[short, medium, long]].copy()
+    for column in (short, medium, long):
+        history[f"{column}_pct"] = rolling_percentile_rank(rv[column], window)
+    complete = history[[short, medium, long]].notna().all(axis=1)
+    history["regime"] = np.where(
+        ~complete, None,
+        np.select(
+            [(rv[short] > rv[medium]) & (rv[medium] > rv[long]),
+             (rv[short] < rv[medium]) & (rv[medium] < rv[long])],
+            ["expansion", "compression"],
+            default="mixed",
+        ),
+    )
+    return history
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling: positions of `threshold`
+    points that keep the visual shape of the line (peaks and troughs
+    survive, unlike every-nth sampling). First and last points are kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_series(series: pd.Series, max_points: int) -> pd.Series:
+    """LTTB-downsampled copy of a date-indexed series (NaNs dropped)."""
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    x = np.arange(len(series), dtype=np.float64)
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=np.float64), max_points)]
+
+
+def load_close_matrix(tickers: Iterable[str]) -> pd.DataFrame:
+    """Date x ticker close matrix from the local raw data store."""
+    from data.store import read_frame
+
+    closes = {t: read_frame(t, "raw", columns=["Close"]).set_index("Date")["Close"] for t in tickers}
+    return pd.DataFrame(closes).sort_index()
+
 
 class RealizedVolatilityAnalyzer:
     """Analyzes historical realized volatility patterns for equity analysis."""
@@ -18,12 +217,13 @@ class RealizedVolatilityAnalyzer:
         self.rv_data = None
         
     def fetch_data(self, months: int = 12) -> pd.DataFrame:
-        """Fetch historical price data."""
+        """Fetch historical price data (local store first, remote tail only)."""
+        from data.price_provider import get_provider
+
         end_date = datetime.now()
         start_date = end_date - timedelta(days=months * 30 + 100)
         
-        stock = yf.Ticker(self.ticker)
-        df = stock.history(start=start_date, end=end_date)
+        df = get_provider().history(self.ticker, start=start_date.date()).set_index('Date')
         
         if df.empty:
             raise ValueError(f"No data found for {self.ticker}")
@@ -50,16 +250,22 @@ class RealizedVolatilityAnalyzer:
         
         return self.rv_data
     
-    def plot_volatility(self) -> plt.Figure:
-        """Create time-series chart of realized volatility."""
+    def regime_history(self, window: int = 252) -> pd.DataFrame:
+        """Per-date RV percentiles and regime over the whole fetched history."""
+        if self.data is None:
+            raise ValueError("Must fetch data first")
+        return volatility_regime_history(realized_volatility(self.data['Close']), window)
+
+    def plot_volatility(self, max_points: int = 500) -> plt.Figure:
+        """Create time-series chart of realized volatility (LTTB-downsampled beyond `max_points`)."""
         if self.rv_data is None:
             raise ValueError("Must calculate volatility first")
         
         fig, ax = plt.subplots(figsize=(12, 6))
         
-        ax.plot(self.rv_data.index, self.rv_data['RV30'], label='RV30', linewidth=2, color='#FF6B6B')
-        ax.plot(self.rv_data.index, self.rv_data['RV60'], label='RV60', linewidth=2, color='#4ECDC4')
-        ax.plot(self.rv_data.index, self.rv_data['RV90'], label='RV90', linewidth=2, color='#45B7D1')
+        for column, color in (('RV30', '#FF6B6B'), ('RV60', '#4ECDC4'), ('RV90', '#45B7D1')):
+            series = downsample_series(self.rv_data[column], max_points)
+            ax.plot(series.index, series, label=column, linewidth=2, color=color)
         
         ax.set_xlabel('Date', fontsize=12)
         ax.set_ylabel('Annualized Volatility (%)', fontsize=12)
@@ -71,6 +277,45 @@ class RealizedVolatilityAnalyzer:
         plt.tight_layout()
         return fig
     
+    def plot_regime_history(self, window: int = 252, max_points: int = 500) -> plt.Figure:
+        """Chart of each window's rolling RV percentile, shaded by expansion/compression regime."""
+        history = self.regime_history(window)
+        cutoff = history.index[-1] - pd.Timedelta(days=365)
+        history = history[history.index >= cutoff]
+
+        fig, ax = plt.subplots(figsize=(12, 4))
+        for regime, color in (('expansion', '#FF6B6B'), ('compression', '#45B7D1')):
+            ax.fill_between(history.index, 0, 100, where=history['regime'] == regime,
+                            color=color, alpha=0.12, step='post', label=regime.capitalize())
+        for column, color in (('RV30_pct', '#FF6B6B'), ('RV60_pct', '#4ECDC4'), ('RV90_pct', '#45B7D1')):
+            series = downsample_series(history[column], max_points)
+            ax.plot(series.index, series, label=column.replace('_pct', ' percentile'), linewidth=1.5, color=color)
+
+        ax.set_xlabel('Date', fontsize=12)
+        ax.set_ylabel(f'Percentile (trailing {window} days)', fontsize=12)
+        ax.set_ylim(0, 100)
+        ax.set_title(f'{self.ticker} Volatility Regime History (Past 12 Months)', fontsize=14, fontweight='bold')
+        ax.legend(loc='best', fontsize=9)
+        ax.grid(True, alpha=0.3)
+
+        plt.tight_layout()
+        return fig
+
+    @staticmethod
+    def _figure_png(fig: plt.Figure, dpi: int) -> bytes:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi)
+        plt.close(fig)
+        return buffer.getvalue()
+
+    def render_volatility_png(self, max_points: int = 500, dpi: int = 100) -> bytes:
+        """Chart from plot_volatility as PNG bytes; the figure is closed afterwards."""
+        return self._figure_png(self.plot_volatility(max_points), dpi)
+
+    def render_regime_png(self, window: int = 252, max_points: int = 500, dpi: int = 100) -> bytes:
+        """Chart from plot_regime_history as PNG bytes; the figure is closed afterwards."""
+        return self._figure_png(self.plot_regime_history(window, max_points), dpi)
+    
     def analyze_volatility_trends(self) -> Dict[str, any]:
         """Analyze volatility patterns and generate insights."""
         if self.rv_data is None: